@@ -0,0 +1,209 @@
+"""Versioned JSON API (/api/v1) for the mobile client.
+
+Every response carries an ETag, and workspace responses also carry
+Last-Modified. Both come from the version that triggers bump on each change to
+a workspace row, including review aggregates. The version check runs before the
+body is built, so an unchanged resource answers 304 without loading or
+serialising it. Availability has no row versions, so its ETag is a hash of the
+(small) payload.
+
+The blueprint reaches the database through app.extensions["cowork"], which
+app.py fills in when it registers the blueprint.
+"""
+import hashlib
+from datetime import datetime
+
+from flask import Blueprint, current_app, jsonify, request, session
+from werkzeug.http import is_resource_modified
+
+import availability
+import bookings
+import listings
+import ratings
+
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+MAX_BATCH_IDS = 100
+WORKSPACE_FIELDS = (
+    "id", "name", "description", "price_per_hour", "currency", "rating", "review_count",
+    "image_path", "owner_id", "version", "updated_at",
+)
+
+
+def _db():
+    return current_app.extensions["cowork"]["db"]()
+
+
+def _error(message, status):
+    return jsonify({"error": message}), status
+
+
+def _digest(parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+
+
+def _parse_updated(value):
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S") if value else None
+
+
+def _conditional(etag, build, last_modified=None, private=False):
+    """Answer 304 if the client's copy is current, otherwise jsonify(build())."""
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = jsonify(build())
+    else:
+        response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Clients may keep a copy but must revalidate it on every use
+    response.cache_control.no_cache = True
+    if private:
+        response.cache_control.private = True
+    return response
+
+
+def _workspace(row):
+    return {field: row[field] for field in WORKSPACE_FIELDS}
+
+
+def _valid_page_cursor(cursor):
+    """Whether a reviews or bookings cursor decodes to the [created_at, id] pair those pages expect."""
+    try:
+        listings.decode_cursor(cursor, (str, int))
+    except ValueError:
+        return False
+    return True
+
+
+@api.route("/workspaces")
+def workspaces():
+    """One page of listings (same filters and cursor as /explore), or a batch with ?ids=1,2,3."""
+    conn = _db()
+    ids_arg = request.args.get("ids")
+    if ids_arg is not None:
+        try:
+            ids = sorted({int(part) for part in ids_arg.split(",") if part.strip()})
+        except ValueError:
+            return _error("ids must be a comma-separated list of integers", 400)
+        if not ids or len(ids) > MAX_BATCH_IDS:
+            return _error("ids must list between 1 and %d workspaces" % MAX_BATCH_IDS, 400)
+        if ids[0] < -listings.MAX_SQL_INT or ids[-1] > listings.MAX_SQL_INT:
+            return _error("ids must be 64-bit integers", 400)
+        rows = conn.execute(
+            "SELECT %s FROM workspaces WHERE id IN (%s) ORDER BY id"
+            % (", ".join(WORKSPACE_FIELDS), ", ".join("?" * len(ids))),
+            ids,
+        ).fetchall()
+        found = {row["id"] for row in rows}
+        etag = "ws-" + _digest([(row["id"], row["version"]) for row in rows])
+        last_modified = max((_parse_updated(row["updated_at"]) for row in rows if row["updated_at"]), default=None)
+        return _conditional(
+            etag,
+            lambda: {"workspaces": [_workspace(row) for row in rows], "missing": [i for i in ids if i not in found]},
+            last_modified,
+        )
+
+    sort = request.args.get("sort", listings.DEFAULT_SORT)
+    if sort not in listings.SORTS:
+        return _error("sort must be one of: %s" % ", ".join(listings.SORTS), 400)
+    filters = listings.parse_filters(request.args)
+    try:
+        rows, next_cursor = listings.explore_page(conn, sort=sort, cursor=request.args.get("cursor") or None, **filters)
+    except ValueError:
+        return _error("invalid cursor", 400)
+    etag = "list-" + _digest([(row["id"], row["version"]) for row in rows] + [next_cursor])
+    return _conditional(
+        etag,
+        lambda: {
+            "workspaces": [{k: row[k] for k in row.keys()} for row in rows],
+            "next_cursor": next_cursor,
+        },
+    )
+
+
+@api.route("/workspaces/<int:workspace_id>")
+def workspace(workspace_id):
+    row = _db().execute(
+        "SELECT %s FROM workspaces WHERE id = ?" % ", ".join(WORKSPACE_FIELDS), (workspace_id,)
+    ).fetchone()
+    if row is None:
+        return _error("workspace not found", 404)
+    return _conditional(
+        "w%d-%d" % (workspace_id, row["version"]), lambda: _workspace(row), _parse_updated(row["updated_at"])
+    )
+
+
+@api.route("/workspaces/<int:workspace_id>/reviews")
+def workspace_reviews(workspace_id):
+    """Reviews newest first, a page at a time (?cursor= from the previous page)."""
+    conn = _db()
+    version = conn.execute(
+        "SELECT version, updated_at FROM workspaces WHERE id = ?", (workspace_id,)
+    ).fetchone()
+    if version is None:
+        return _error("workspace not found", 404)
+    cursor = request.args.get("cursor") or None
+
+    def build():
+        rows, next_cursor = ratings.reviews_page(conn, workspace_id, cursor=cursor)
+        return {
+            "reviews": [{k: row[k] for k in row.keys()} for row in rows],
+            "next_cursor": next_cursor,
+        }
+
+    if cursor is not None and not _valid_page_cursor(cursor):
+        return _error("invalid cursor", 400)
+    # Adding or removing a review updates the workspace's aggregates, which bumps its version
+    return _conditional(
+        "r%d-%d" % (workspace_id, version["version"]), build, _parse_updated(version["updated_at"])
+    )
+
+
+@api.route("/workspaces/<int:workspace_id>/availability")
+def workspace_availability(workspace_id):
+    """Free and booked hours for ?date=YYYY-MM-DD, or ?start=YYYY-MM-DD&days=N."""
+    conn = _db()
+    if conn.execute("SELECT 1 FROM workspaces WHERE id = ?", (workspace_id,)).fetchone() is None:
+        return _error("workspace not found", 404)
+    try:
+        payload = availability.query_availability(
+            conn, workspace_id, request.args, datetime.utcnow().date().isoformat()
+        )
+    except ValueError:
+        return _error(availability.QUERY_USAGE, 400)
+    return _conditional("a" + _digest(payload), lambda: payload)
+
+
+@api.route("/me/bookings")
+def my_bookings():
+    """The logged-in user's bookings (?view=upcoming|past, ?cursor=) plus summary totals."""
+    user_id = session.get("user_id")
+    if not user_id:
+        return _error("login required", 401)
+    view = request.args.get("view", "upcoming")
+    if view not in bookings.VIEWS:
+        return _error("view must be one of: %s" % ", ".join(bookings.VIEWS), 400)
+    cursor = request.args.get("cursor") or None
+    conn = _db()
+    # New bookings raise the max id; deletions lower the count
+    count, last_id = conn.execute(
+        "SELECT COUNT(*), MAX(id) FROM bookings WHERE user_id = ?", (user_id,)
+    ).fetchone()
+    today = datetime.utcnow().date().isoformat()
+
+    def build():
+        rows, next_cursor = bookings.bookings_page(conn, user_id, view, today, cursor=cursor)
+        return {
+            "bookings": [
+                {k: row[k] for k in ("id", "workspace_id", "workspace_name", "currency", "booking_date",
+                                     "start_time", "hours", "total_price", "created_at")}
+                for row in rows
+            ],
+            "next_cursor": next_cursor,
+            "summary": bookings.user_summary(conn, user_id),
+        }
+
+    if cursor is not None and not _valid_page_cursor(cursor):
+        return _error("invalid cursor", 400)
+    # The upcoming/past split moves with the date, so it is part of the tag
+    return _conditional("b%d-%d-%s-%s" % (user_id, count, last_id or 0, today), build, private=True)
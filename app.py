@@ -1,10 +1,30 @@
 import os
+import queue
+import secrets
 import sqlite3
+import threading
+import uuid
 from datetime import datetime
-
-from flask import Flask, render_template, request, redirect, url_for, flash, session, send_from_directory
-from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
+from functools import partial
+
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, session, g, jsonify, abort
+from werkzeug.local import LocalProxy
+
+import assets
+import availability
+from api import api
+import bookings
+import cache
+import geo
+import hosts
+import images
+import listings
+import metrics
+import migrations
+import passwords
+import ratings
+import search
+import writes
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 DB_PATH = os.path.join(BASE_DIR, "cowork.db")
@@ -12,151 +32,279 @@ UPLOAD_FOLDER = os.path.join(BASE_DIR, "static", "uploads")
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
 
 app = Flask(__name__)
-app.secret_key = "dev-secret-key-change-me"  # for demo only
+# Every worker must share one key; without COWORK_SECRET_KEY create_app() picks a random
+# one, so sessions last until the next restart
+app.config["SECRET_KEY"] = os.environ.get("COWORK_SECRET_KEY")
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+app.config["DATABASE"] = os.environ.get("COWORK_DB", DB_PATH)
+app.config["DB_POOL_SIZE"] = 8
+# Query-result cache; set COWORK_CACHE=0 to compare against uncached reads
+app.config["CACHE_ENABLED"] = os.environ.get("COWORK_CACHE", "1") != "0"
+app.config["CACHE_BACKEND"] = os.environ.get("COWORK_CACHE_BACKEND", "memory")  # or "file"
+app.config["CACHE_DIR"] = os.environ.get("COWORK_CACHE_DIR", os.path.join(BASE_DIR, ".cache"))
+app.config["CACHE_TTL"] = 60
+app.config["CACHE_MAXSIZE"] = 512
+# Password hashing runs in a bounded process pool; COWORK_HASH_OFFLOAD=0 hashes inline.
+# Stored hashes made with a different method are upgraded on the user's next login.
+app.config["PASSWORD_HASH_METHOD"] = passwords.DEFAULT_METHOD
+app.config["PASSWORD_HASH_OFFLOAD"] = os.environ.get("COWORK_HASH_OFFLOAD", "1") != "0"
+app.config["PASSWORD_HASH_WORKERS"] = 2
+app.config["PASSWORD_HASH_MAX_PENDING"] = 16
+# Login/register attempts allowed per client IP and per account within the window (seconds)
+app.config["LOGIN_ATTEMPTS_PER_IP"] = 20
+app.config["LOGIN_ATTEMPTS_PER_ACCOUNT"] = 10
+app.config["LOGIN_ATTEMPT_WINDOW"] = 60
+# Statements slower than this are logged (logger "cowork.slowquery") with their query plan
+app.config["SLOW_QUERY_MS"] = 100
+# Serve css/js under content-hashed names with a year-long cache; COWORK_ASSET_FINGERPRINTS=0 turns it off
+app.config["ASSET_FINGERPRINTS"] = os.environ.get("COWORK_ASSET_FINGERPRINTS", "1") != "0"
+# Opt-in: COWORK_WRITE_QUEUE=1 sends booking and review inserts through one group-committing writer per worker
+app.config["WRITE_QUEUE"] = os.environ.get("COWORK_WRITE_QUEUE", "0") == "1"
+app.config["WRITE_QUEUE_TIMEOUT"] = 10.0
+
+# Per-connection pragmas. journal_mode=WAL is persistent and is set once in init_db();
+# with WAL, synchronous=NORMAL is still crash-safe and avoids an fsync per commit.
+SQLITE_PRAGMAS = (
+    ("synchronous", "NORMAL"),
+    ("cache_size", "-16000"),  # negative = KiB, i.e. ~16 MB page cache per connection
+    ("mmap_size", "134217728"),  # 128 MB memory-mapped reads
+    ("busy_timeout", "5000"),  # wait up to 5s for a writer instead of raising "database is locked"
+    ("temp_store", "MEMORY"),
+)
+
+
+def connect_db(path=None, factory=metrics.InstrumentedConnection):
+    """Open a new SQLite connection with the app's row factory and pragmas applied."""
+    conn = sqlite3.connect(path or app.config["DATABASE"], timeout=5.0, check_same_thread=False, factory=factory)
+    conn.row_factory = sqlite3.Row
+    for name, value in SQLITE_PRAGMAS:
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+class ConnectionPool:
+    """Small thread-safe pool of SQLite connections to a single database file.
 
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    Connections are handed out to one request at a time, so sharing them across
+    threads (check_same_thread=False) is safe. Idle connections beyond `size` are closed.
+    """
+
+    def __init__(self, path, size=8):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return connect_db(self.path)
+
+    def release(self, conn):
+        # Never hand out a connection with a half-finished transaction
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=None):
+    path = path or app.config["DATABASE"]
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(path, app.config["DB_POOL_SIZE"])
+        return pool
 
 
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Return the connection bound to the current app context.
 
+    The first call in a request checks a connection out of the worker's pool; later
+    calls (views, context processors) reuse it, and close_db() returns it on teardown.
+    """
+    if "db" not in g:
+        g.db = get_pool().acquire()
+    return g.db
 
-def init_db():
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    # Create tables
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL
-        );
-        """
-    )
 
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS workspaces (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            description TEXT,
-            price_per_hour REAL NOT NULL,
-            rating REAL,
-            image_path TEXT,
-            currency TEXT DEFAULT 'USD',
-            owner_id INTEGER,
-            FOREIGN KEY(owner_id) REFERENCES users(id)
-        );
-        """
-    )
+@app.before_request
+def start_metrics():
+    metrics.slow_query_seconds = app.config["SLOW_QUERY_MS"] / 1000.0
+    metrics.start_request(request.endpoint)
 
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS bookings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            workspace_id INTEGER NOT NULL,
-            booking_date TEXT NOT NULL,
-            start_time TEXT,
-            hours INTEGER NOT NULL,
-            total_price REAL NOT NULL,
-            created_at TEXT NOT NULL,
-            FOREIGN KEY(user_id) REFERENCES users(id),
-            FOREIGN KEY(workspace_id) REFERENCES workspaces(id)
-        );
-        """
-    )
 
-    # Reviews table
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS reviews (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            workspace_id INTEGER NOT NULL,
-            rating INTEGER NOT NULL,
-            comment TEXT,
-            created_at TEXT NOT NULL,
-            FOREIGN KEY(user_id) REFERENCES users(id),
-            FOREIGN KEY(workspace_id) REFERENCES workspaces(id)
-        );
-        """
-    )
+@app.after_request
+def record_metrics(response):
+    metrics.finish_request(request.method, response.status_code)
+    return response
 
-    conn.commit()
-    # Ensure `currency` column exists (older DBs may lack it)
-    cur.execute("PRAGMA table_info(workspaces)")
-    existing_cols = [c[1] for c in cur.fetchall()]
-    if "currency" not in existing_cols:
-        cur.execute("ALTER TABLE workspaces ADD COLUMN currency TEXT DEFAULT 'USD'")
-        conn.commit()
 
-    # Ensure bookings table has booking_date column for older DBs
-    cur.execute("PRAGMA table_info(bookings)")
-    booking_cols = [c[1] for c in cur.fetchall()]
-    if "booking_date" not in booking_cols:
-        try:
-            cur.execute("ALTER TABLE bookings ADD COLUMN booking_date TEXT")
-            conn.commit()
-        except Exception:
-            # If bookings table doesn't exist yet or another issue, ignore and continue
-            pass
-    # Ensure bookings table has start_time column for older DBs
-    if "start_time" not in booking_cols:
-        try:
-            cur.execute("ALTER TABLE bookings ADD COLUMN start_time TEXT")
-            conn.commit()
-        except Exception:
-            pass
-
-    # Seed example workspaces if none exist
-    cur.execute("SELECT COUNT(*) as cnt FROM workspaces")
-    count = cur.fetchone()["cnt"]
-    if count == 0:
-        example_workspaces = [
-            # US examples (USD)
-            ("Downtown Loft Desk", "Modern desk space with fast Wi-Fi and great city view.", 12.5, 4.7, None, 'INR', None),
-            ("Creative Hub Meeting Room", "Bright meeting room ideal for workshops and client calls.", 25.0, 4.5, None, 'USD', None),
-            ("Quiet Focus Pod", "Soundproof pod for deep work and focus.", 15.0, 4.9, None, 'USD', None),
-            # Indian examples (INR) with placeholder SVGs in static/uploads
-            ("Bengaluru Startup Loft", "Cozy loft in Koramangala with reliable internet and vibrant community.",None, 350.0, 4.8, 'INR', None),
-            ("Delhi Meeting Suite", "Professional meeting suite in Connaught Place with presentation setup.", 1200.0, 4.6,  'INR', None),
-            ("Mumbai Focus Pod", "Private focus pod near Bandra with ergonomic chair and quiet ambiance.", 450.0, 4.7,  'INR', None),
-            ("Hyderabad Creative Hub", "Spacious creative workspace with whiteboards and natural light.", 800.0, 4.5, 'INR', None),
-        ]
-        cur.executemany(
-            """
-            INSERT INTO workspaces (name, description, price_per_hour, rating, image_path, currency, owner_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            example_workspaces,
+@app.teardown_appcontext
+def close_db(exc):
+    conn = g.pop("db", None)
+    if conn is not None:
+        get_pool().release(conn)
+
+
+_cache = None
+
+
+def get_cache():
+    """Return the process-wide query cache, creating it from app.config on first use."""
+    global _cache
+    if _cache is None:
+        if app.config["CACHE_BACKEND"] == "file":
+            backend = cache.FileBackend(app.config["CACHE_DIR"], app.config["CACHE_TTL"], app.config["CACHE_MAXSIZE"])
+        else:
+            backend = cache.MemoryBackend(app.config["CACHE_MAXSIZE"], app.config["CACHE_TTL"])
+        _cache = cache.Cache(backend, enabled=app.config["CACHE_ENABLED"])
+    return _cache
+
+
+_assets = None
+_write_queue = None
+_write_queue_lock = threading.Lock()
+_hasher = None
+_limiters = None
+
+
+def get_write_queue():
+    """Return this worker's group-commit writer, starting its thread on first use."""
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            path = app.config["DATABASE"]
+            _write_queue = writes.WriteQueue(
+                lambda: connect_db(path, factory=sqlite3.Connection), timeout=app.config["WRITE_QUEUE_TIMEOUT"]
+            )
+        return _write_queue
+
+
+def idempotency_key():
+    """The form's idempotency key, if it sent a plausible one."""
+    key = request.form.get("idempotency_key", "").strip()
+    return key if 0 < len(key) <= 64 else None
+
+
+def get_assets():
+    """Return the fingerprinted asset manifest, rebuilt after edits when running in debug mode."""
+    global _assets
+    if _assets is None:
+        _assets = assets.AssetManifest(app.static_folder)
+    elif app.debug and _assets.stale():
+        _assets.build()
+    return _assets
+
+
+def get_hasher():
+    global _hasher
+    if _hasher is None:
+        _hasher = passwords.PasswordHasher(
+            method=app.config["PASSWORD_HASH_METHOD"],
+            workers=app.config["PASSWORD_HASH_WORKERS"],
+            max_pending=app.config["PASSWORD_HASH_MAX_PENDING"],
+            offload=app.config["PASSWORD_HASH_OFFLOAD"],
         )
-        conn.commit()
+    return _hasher
 
-    # Ensure Indian example entries exist (insert if missing)
-    cur.execute("SELECT COUNT(*) as has_b FROM workspaces WHERE name = ?", ("Bengaluru Startup Loft",))
-    if cur.fetchone()["has_b"] == 0:
-        indian_examples = [
-            ("Bengaluru Startup Loft", "Cozy loft in Koramangala with reliable internet and vibrant community.", 350.0, 4.8, 'uploads/bengaluru_loft.svg', 'INR', None),
-            ("Delhi Meeting Suite", "Professional meeting suite in Connaught Place with presentation setup.", 1200.0, 4.6, 'uploads/delhi_meeting.svg', 'INR', None),
-            ("Mumbai Focus Pod", "Private focus pod near Bandra with ergonomic chair and quiet ambiance.", 450.0, 4.7, 'uploads/mumbai_pod.svg', 'INR', None),
-            ("Hyderabad Creative Hub", "Spacious creative workspace with whiteboards and natural light.", 800.0, 4.5, 'uploads/hyderabad_hub.svg', 'INR', None),
-        ]
-        cur.executemany(
-            """
-            INSERT INTO workspaces (name, description, price_per_hour, rating, image_path, currency, owner_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            indian_examples,
+
+def get_login_limiters():
+    """Return the (per-IP, per-account) attempt limiters for this worker."""
+    global _limiters
+    if _limiters is None:
+        window = app.config["LOGIN_ATTEMPT_WINDOW"]
+        _limiters = (
+            passwords.AttemptLimiter(app.config["LOGIN_ATTEMPTS_PER_IP"], window),
+            passwords.AttemptLimiter(app.config["LOGIN_ATTEMPTS_PER_ACCOUNT"], window),
         )
-        conn.commit()
+    return _limiters
+
+
+def create_app(config=None):
+    """Configure the app for the current process and return it.
+
+    Routes are registered on the module-level `app` at import. This applies
+    `config` on top of the COWORK_* defaults, settles the secret key and upload
+    folder, and drops per-process state (connection pools, caches, the hash pool,
+    the write queue) that a parent process may have created. It is safe to call
+    again in a freshly forked worker, and scripts call it again to apply new
+    settings.
+    """
+    if config:
+        app.config.update(config)
+    if not app.config["SECRET_KEY"]:
+        app.config["SECRET_KEY"] = secrets.token_hex(32)
+    os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+    reset_process_state()
+    return app
+
+
+def reset_process_state():
+    """Forget lazily created pools, caches and threads; each process builds its own on first use."""
+    global _cache, _hasher, _limiters, _write_queue
+    with _pools_lock:
+        _pools.clear()
+    with _write_queue_lock:
+        _write_queue = None
+    _cache = None
+    _hasher = None
+    _limiters = None
+    images.reset_executor()
+
+
+def shutdown_process():
+    """Release this process's resources on a graceful stop: flush queued writes, close connections."""
+    global _hasher, _write_queue
+    with _write_queue_lock:
+        if _write_queue is not None:
+            _write_queue.close()
+            _write_queue = None
+    if _hasher is not None:
+        _hasher.shutdown()
+        _hasher = None
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+
+
+def warm_up():
+    """Compile every template and fingerprint the static assets before taking traffic.
+
+    Done once in the master of a preforked server (scripts/serve.py), so workers
+    inherit the compiled templates instead of each compiling them on first use.
+    Templates are also no longer checked for changes on every render.
+    """
+    app.config["TEMPLATES_AUTO_RELOAD"] = False
+    app.jinja_env.auto_reload = False
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    if app.config["ASSET_FINGERPRINTS"]:
+        get_assets()
+    return len(names)
 
+
+def init_db():
+    """Bring the database schema up to date; a single pragma read once it is."""
+    conn = connect_db()
+    if migrations.current_version(conn) < migrations.LATEST:
+        # WAL lets /explore readers run while bookings and reviews are being written
+        conn.execute("PRAGMA journal_mode = WAL")
+        migrations.migrate(conn)
     conn.close()
 
 
@@ -177,16 +325,73 @@ def login_required(view_func):
     return wrapped
 
 
+# Small per-worker cache of user rows (without password hashes) for load_current_user()
+_user_cache = cache.Cache(cache.MemoryBackend(maxsize=1024, ttl=300))
+
+
+def load_current_user():
+    """Return the logged-in user's row, or None.
+
+    Loaded at most once per request, and served from a per-worker cache that
+    invalidate_user() clears whenever the user's row is written.
+    """
+    if "current_user" not in g:
+        user_id = session.get("user_id")
+        user = None
+        if user_id:
+            def load_user():
+                row = get_db_connection().execute(
+                    "SELECT id, username, email FROM users WHERE id = ?", (user_id,)
+                ).fetchone()
+                return dict(row) if row else None
+
+            user = _user_cache.get_or_load("user:%d" % user_id, "row", load_user)
+        g.current_user = user
+    return g.current_user
+
+
+def invalidate_user(user_id):
+    _user_cache.invalidate("user:%d" % user_id)
+
+
 @app.context_processor
 def inject_user():
-    user = None
-    user_id = session.get("user_id")
-    if user_id:
-        conn = get_db_connection()
-        user = conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
-        conn.close()
+    # current_user is only queried if a template actually reads it; the navigation
+    # only needs to know whether someone is logged in, which the session tells us.
     # Expose the datetime class to all templates so base.html can call datetime.utcnow()
-    return {"current_user": user, "datetime": datetime}
+    return {
+        "current_user": LocalProxy(load_current_user),
+        "is_authenticated": "user_id" in session,
+        "datetime": datetime,
+    }
+
+
+@app.url_defaults
+def fingerprint_static(endpoint, values):
+    if endpoint == "static" and app.config["ASSET_FINGERPRINTS"] and "filename" in values:
+        values["filename"] = get_assets().url_name(values["filename"])
+
+
+@app.endpoint("static")
+def static_file(filename):
+    """Fingerprinted css/js from memory (compressed if accepted); anything else from disk."""
+    if app.config["ASSET_FINGERPRINTS"]:
+        response = get_assets().response(filename, request)
+        if response is not None:
+            return response
+    return assets.send_static(app.static_folder, filename)
+
+
+@app.template_global()
+def new_idempotency_key():
+    """A fresh key for a write form, so a resubmitted form doesn't write twice."""
+    return uuid.uuid4().hex
+
+
+@app.template_global()
+def image_variants(image_path, size):
+    """Smallest prebuilt variant of an uploaded image for templates (see images.py)."""
+    return images.image_variants(app.static_folder, image_path, size)
 
 
 @app.route("/")
@@ -210,21 +415,28 @@ def register():
             flash("Passwords do not match.", "danger")
             return redirect(url_for("register"))
 
-        password_hash = generate_password_hash(password)
+        ip_limiter, _ = get_login_limiters()
+        if not ip_limiter.allow(request.remote_addr):
+            flash("Too many attempts. Please wait a minute and try again.", "danger")
+            return redirect(url_for("register"))
+        try:
+            password_hash = get_hasher().hash(password)
+        except passwords.HashingBusy:
+            flash("We're handling a lot of sign-ups right now. Please try again in a moment.", "warning")
+            return redirect(url_for("register"))
 
         conn = get_db_connection()
         try:
-            conn.execute(
+            cur = conn.execute(
                 "INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)",
                 (username, email, password_hash),
             )
             conn.commit()
         except sqlite3.IntegrityError:
             flash("Username or email already exists.", "danger")
-            conn.close()
             return redirect(url_for("register"))
+        invalidate_user(cur.lastrowid)
 
-        conn.close()
         flash("Registration successful. Please log in.", "success")
         return redirect(url_for("login"))
 
@@ -237,14 +449,32 @@ def login():
         username_or_email = request.form.get("username", "").strip()
         password = request.form.get("password", "")
 
+        # Reject floods before they cost a password hash
+        ip_limiter, account_limiter = get_login_limiters()
+        if not ip_limiter.allow(request.remote_addr) or not account_limiter.allow(username_or_email.lower()):
+            flash("Too many login attempts. Please wait a minute and try again.", "danger")
+            return redirect(url_for("login"))
+
         conn = get_db_connection()
         user = conn.execute(
             "SELECT * FROM users WHERE username = ? OR email = ?",
             (username_or_email, username_or_email),
         ).fetchone()
-        conn.close()
 
-        if user and check_password_hash(user["password_hash"], password):
+        ok = False
+        if user:
+            try:
+                ok, upgraded_hash = get_hasher().verify(user["password_hash"], password)
+            except passwords.HashingBusy:
+                flash("We're handling a lot of logins right now. Please try again in a moment.", "warning")
+                return redirect(url_for("login"))
+        if ok:
+            if upgraded_hash:
+                # Stored hash used older cost parameters: replace it now that we know the password
+                conn.execute("UPDATE users SET password_hash = ? WHERE id = ?", (upgraded_hash, user["id"]))
+                conn.commit()
+                invalidate_user(user["id"])
+            account_limiter.reset(username_or_email.lower())
             session["user_id"] = user["id"]
             flash("Logged in successfully.", "success")
             next_url = request.args.get("next")
@@ -266,24 +496,84 @@ def logout():
 
 @app.route("/explore")
 def explore():
-    conn = get_db_connection()
-    workspaces = conn.execute("SELECT * FROM workspaces ORDER BY rating DESC").fetchall()
-    conn.close()
-    return render_template("explore.html", workspaces=workspaces)
+    sort = request.args.get("sort", listings.DEFAULT_SORT)
+    if sort not in listings.SORTS:
+        sort = listings.DEFAULT_SORT
+    filters = listings.parse_filters(request.args)
+    cursor = request.args.get("cursor") or None
+    # ?near=lat,lon switches to nearest-first within radius_km
+    point = None
+    if request.args.get("near"):
+        try:
+            point = geo.parse_point(request.args["near"])
+        except ValueError:
+            flash("Location must be given as latitude,longitude.", "warning")
+    radius_km = listings.float_arg(request.args.get("radius_km"))
+    if radius_km is None or radius_km <= 0:
+        radius_km = geo.DEFAULT_RADIUS_KM
+    radius_km = min(radius_km, geo.MAX_RADIUS_KM)
+
+    def load_page():
+        conn = get_db_connection()
+        if point is not None:
+            try:
+                return geo.nearby_page(conn, *point, radius_km=radius_km, cursor=cursor, **filters)
+            except ValueError:
+                return geo.nearby_page(conn, *point, radius_km=radius_km, **filters)
+        try:
+            rows, next_cursor = listings.explore_page(conn, sort=sort, cursor=cursor, **filters)
+        except ValueError:
+            # Stale or hand-edited cursor: start again from the first page
+            rows, next_cursor = listings.explore_page(conn, sort=sort, **filters)
+        return cache.rows_to_dicts(rows), next_cursor
+
+    key = repr((sort, cursor, sorted(filters.items()), point, radius_km if point else None))
+    workspaces, next_cursor = get_cache().get_or_load("explore", key, load_page)
+    # Keep the active filters on the "next page" link
+    query = {k: v for k, v in request.args.items() if k != "cursor" and v}
+    return render_template(
+        "explore.html",
+        workspaces=workspaces,
+        next_cursor=next_cursor,
+        query=query,
+        sort=sort,
+        near=point,
+        radius_km=radius_km,
+        is_first_page=not request.args.get("cursor"),
+    )
+
+
+@app.route("/search")
+def search_page():
+    q = request.args.get("q", "").strip()
+    try:
+        page = min(max(1, int(request.args.get("page", "1"))), search.MAX_PAGE)
+    except ValueError:
+        page = 1
+    results, has_more = [], False
+    if q:
+        def load_results():
+            rows, more = search.search_workspaces(get_db_connection(), q, page=page)
+            return cache.rows_to_dicts(rows), more
+
+        results, has_more = get_cache().get_or_load("search", repr((q, page)), load_results)
+    return render_template(
+        "search.html", q=q, results=results, page=page, has_more=has_more, highlight=search.highlight
+    )
 
 
 @app.route("/workspace/<int:workspace_id>", methods=["GET", "POST"])
 def workspace_detail(workspace_id):
-    conn = get_db_connection()
-    workspace = conn.execute(
-        "SELECT * FROM workspaces WHERE id = ?", (workspace_id,)
-    ).fetchone()
-    # fetch reviews for this workspace with reviewer username
-    reviews = conn.execute(
-        "SELECT r.*, u.username as username FROM reviews r LEFT JOIN users u ON r.user_id = u.id WHERE r.workspace_id = ? ORDER BY r.created_at DESC",
-        (workspace_id,),
-    ).fetchall()
-    conn.close()
+    def load_detail():
+        conn = get_db_connection()
+        workspace = conn.execute(
+            "SELECT * FROM workspaces WHERE id = ?", (workspace_id,)
+        ).fetchone()
+        # Only the newest page of reviews; older ones are fetched from workspace_reviews on demand
+        reviews, next_cursor = ratings.reviews_page(conn, workspace_id)
+        return (dict(workspace) if workspace else None), cache.rows_to_dicts(reviews), next_cursor
+
+    workspace, reviews, next_cursor = get_cache().get_or_load("workspace:%d" % workspace_id, "detail", load_detail)
     if workspace is None:
         flash("Workspace not found.", "danger")
         return redirect(url_for("explore"))
@@ -298,7 +588,7 @@ def workspace_detail(workspace_id):
         try:
             # validate hours
             hours_int = int(hours)
-            if hours_int <= 0:
+            if hours_int <= 0 or hours_int > availability.MAX_BOOKING_HOURS:
                 raise ValueError
             # validate booking_date format YYYY-MM-DD
             try:
@@ -318,48 +608,126 @@ def workspace_detail(workspace_id):
         except Exception:
             flash("Please select a valid hourly start time (e.g. 09:00).", "danger")
             return redirect(url_for("workspace_detail", workspace_id=workspace_id))
+        try:
+            availability.split_booking(booking_date, st.hour, hours_int)
+        except ValueError:
+            # e.g. a booking that would run past 9999-12-31
+            flash("Please enter a valid booking date.", "danger")
+            return redirect(url_for("workspace_detail", workspace_id=workspace_id))
         total_price = hours_int * workspace["price_per_hour"]
-        conn = get_db_connection()
-        conn.execute(
-            """
-            INSERT INTO bookings (user_id, workspace_id, booking_date, start_time, hours, total_price, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                session["user_id"],
-                workspace_id,
-                booking_date,
-                start_time_val,
-                hours_int,
-                total_price,
-                datetime.utcnow().isoformat(),
-            ),
-        )
-        conn.commit()
-        conn.close()
+        args = (session["user_id"], workspace_id, booking_date, start_time_val, hours_int, total_price, None,
+                idempotency_key())
+        try:
+            if app.config["WRITE_QUEUE"]:
+                get_write_queue().submit(availability.insert_booking, *args)
+            else:
+                availability.book_slot(get_db_connection(), *args)
+        except availability.BookingConflict:
+            flash("That time slot is already booked. Please choose another time.", "danger")
+            return redirect(url_for("workspace_detail", workspace_id=workspace_id))
+        except TimeoutError:
+            flash("We couldn't confirm your booking in time. Please submit it again.", "warning")
+            return redirect(url_for("workspace_detail", workspace_id=workspace_id))
+        get_cache().invalidate("availability:%d" % workspace_id)
         flash("Booking confirmed for {} at {}!".format(booking_date, start_time_val), "success")
         return redirect(url_for("dashboard"))
 
-    return render_template("workspace_detail.html", workspace=workspace, reviews=reviews)
+    return render_template(
+        "workspace_detail.html", workspace=workspace, reviews=reviews, next_cursor=next_cursor,
+        max_booking_hours=availability.MAX_BOOKING_HOURS,
+    )
+
+
+@app.route("/workspace/<int:workspace_id>/reviews")
+def workspace_reviews(workspace_id):
+    """Reviews older than ?before= (a cursor from the previous page), as an HTML fragment or JSON."""
+    before = request.args.get("before") or None
+
+    def load_reviews():
+        try:
+            rows, next_cursor = ratings.reviews_page(get_db_connection(), workspace_id, cursor=before)
+        except ValueError:
+            return None
+        return cache.rows_to_dicts(rows), next_cursor
+
+    # Cached next to the detail page, so a new review invalidates both
+    page = get_cache().get_or_load("workspace:%d" % workspace_id, repr(("reviews", before)), load_reviews)
+    if page is None:
+        return jsonify({"error": "invalid cursor"}), 400
+    reviews, next_cursor = page
+    if request.accept_mimetypes.best_match(["text/html", "application/json"]) == "application/json":
+        return jsonify({"reviews": reviews, "next_cursor": next_cursor})
+    return render_template("_reviews_page.html", reviews=reviews, next_cursor=next_cursor, workspace_id=workspace_id)
+
+
+@app.route("/workspace/<int:workspace_id>/availability")
+def workspace_availability(workspace_id):
+    """Free and booked hourly slots for one day (?date=) or a calendar range (?start=&days=)."""
+    def load_availability():
+        conn = get_db_connection()
+        if conn.execute("SELECT 1 FROM workspaces WHERE id = ?", (workspace_id,)).fetchone() is None:
+            return 404, None
+        try:
+            return 200, availability.query_availability(
+                conn, workspace_id, request.args, datetime.utcnow().date().isoformat()
+            )
+        except ValueError:
+            return 400, {"error": availability.QUERY_USAGE}
+
+    # Without ?date= the answer depends on today's date, so it is part of the key
+    key = repr((sorted(request.args.items()), datetime.utcnow().date().isoformat()))
+    status, payload = get_cache().get_or_load("availability:%d" % workspace_id, key, load_availability)
+    if status == 404:
+        abort(404)
+    return jsonify(payload), status
 
 
 @app.route("/dashboard")
 @login_required
 def dashboard():
     user_id = session["user_id"]
+    view = request.args.get("view", "upcoming")
+    if view not in bookings.VIEWS:
+        view = "upcoming"
+    cursor = request.args.get("cursor") or None
     conn = get_db_connection()
-    bookings = conn.execute(
-        """
-        SELECT b.*, w.name as workspace_name, w.price_per_hour, w.rating
-        FROM bookings b
-        JOIN workspaces w ON b.workspace_id = w.id
-        WHERE b.user_id = ?
-        ORDER BY b.created_at DESC
-        """,
-        (user_id,),
-    ).fetchall()
-    conn.close()
-    return render_template("dashboard.html", bookings=bookings)
+    today = datetime.utcnow().date().isoformat()
+    try:
+        rows, next_cursor = bookings.bookings_page(conn, user_id, view, today, cursor=cursor)
+    except ValueError:
+        # Tampered or stale cursor: start over from the newest booking
+        rows, next_cursor = bookings.bookings_page(conn, user_id, view, today)
+        cursor = None
+    summary = bookings.user_summary(conn, user_id)
+    return render_template(
+        "dashboard.html",
+        bookings=rows,
+        summary=summary,
+        view=view,
+        next_cursor=next_cursor,
+        is_first_page=cursor is None,
+    )
+
+
+@app.route("/host")
+@login_required
+def host_dashboard():
+    grain = request.args.get("grain", "day")
+    if grain not in hosts.GRAINS:
+        grain = "day"
+    stats = hosts.host_stats(get_db_connection(), session["user_id"], grain, datetime.utcnow().date())
+    return render_template("host.html", stats=stats, grain=grain)
+
+
+@app.route("/host/stats")
+@login_required
+def host_stats():
+    """The host page's numbers as JSON (?grain=day|week|month)."""
+    grain = request.args.get("grain", "day")
+    if grain not in hosts.GRAINS:
+        return jsonify({"error": "grain must be one of: %s" % ", ".join(hosts.GRAINS)}), 400
+    stats = hosts.host_stats(get_db_connection(), session["user_id"], grain, datetime.utcnow().date(), series=True)
+    return jsonify(stats)
 
 
 @app.route("/workspace/<int:workspace_id>/review", methods=["POST"])
@@ -376,13 +744,17 @@ def submit_review(workspace_id):
         flash("Please provide a rating between 1 and 5.", "danger")
         return redirect(url_for("workspace_detail", workspace_id=workspace_id))
 
-    conn = get_db_connection()
-    conn.execute(
-        "INSERT INTO reviews (user_id, workspace_id, rating, comment, created_at) VALUES (?, ?, ?, ?, ?)",
-        (session["user_id"], workspace_id, rating_int, comment or None, datetime.utcnow().isoformat()),
-    )
-    conn.commit()
-    conn.close()
+    args = (session["user_id"], workspace_id, rating_int, comment or None, idempotency_key())
+    try:
+        if app.config["WRITE_QUEUE"]:
+            get_write_queue().submit(partial(ratings.add_review, commit=False), *args)
+        else:
+            ratings.add_review(get_db_connection(), *args)
+    except TimeoutError:
+        flash("We couldn't save your review in time. Please submit it again.", "warning")
+        return redirect(url_for("workspace_detail", workspace_id=workspace_id))
+    # The review changes this workspace's aggregates and therefore listing order
+    get_cache().invalidate("explore", "search", "workspace:%d" % workspace_id)
 
     flash("Thanks for your review!", "success")
     return redirect(url_for("workspace_detail", workspace_id=workspace_id))
@@ -416,22 +788,32 @@ def new_workspace():
                 flash("Rating must be a number.", "danger")
                 return redirect(url_for("new_workspace"))
 
+        latitude = request.form.get("latitude", "").strip()
+        longitude = request.form.get("longitude", "").strip()
+        if latitude or longitude:
+            try:
+                latitude, longitude = geo.check_point(latitude, longitude)
+            except ValueError:
+                flash("Enter both latitude and longitude as decimal degrees, or leave both empty.", "danger")
+                return redirect(url_for("new_workspace"))
+        else:
+            latitude = longitude = None
+
         image_path = None
         if image_file and image_file.filename:
             if allowed_file(image_file.filename):
-                filename = secure_filename(image_file.filename)
-                save_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-                image_file.save(save_path)
+                filename = images.save_upload(image_file, app.config["UPLOAD_FOLDER"])
                 image_path = f"uploads/{filename}"
+                images.schedule_derivatives(app.static_folder, image_path)
             else:
                 flash("Invalid image type.", "danger")
                 return redirect(url_for("new_workspace"))
 
         conn = get_db_connection()
-        conn.execute(
+        cur = conn.execute(
             """
-            INSERT INTO workspaces (name, description, price_per_hour, rating, image_path, owner_id)
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT INTO workspaces (name, description, price_per_hour, rating, image_path, owner_id, latitude, longitude)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
                 name,
@@ -440,22 +822,45 @@ def new_workspace():
                 rating_val,
                 image_path,
                 session["user_id"],
+                latitude,
+                longitude,
             ),
         )
         conn.commit()
-        conn.close()
+        # A "not found" for the new id may have been cached before it existed
+        get_cache().invalidate("explore", "search", "workspace:%d" % cur.lastrowid)
         flash("Workspace added successfully.", "success")
         return redirect(url_for("explore"))
 
     return render_template("new_workspace.html")
 
 
+@app.route("/metrics")
+def metrics_view():
+    """Prometheus scrape endpoint for this worker's request, SQL and cache metrics."""
+    stats = get_cache().stats()
+    gauges = [
+        ("cowork_cache_hits", (), stats["hits"]),
+        ("cowork_cache_misses", (), stats["misses"]),
+        ("cowork_cache_invalidations", (), stats["invalidations"]),
+        ("cowork_cache_entries", (), stats["entries"]),
+    ]
+    return Response(metrics.registry.render(gauges), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/uploads/<path:filename>")
 def uploaded_file(filename):
     # Optional direct serving route if needed
-    return send_from_directory(app.config["UPLOAD_FOLDER"], filename)
+    return assets.send_static(app.config["UPLOAD_FOLDER"], filename)
+
+
+# The JSON API lives in its own module and reaches the database through this hook
+app.extensions["cowork"] = {"db": get_db_connection}
+app.register_blueprint(api)
 
 
 if __name__ == "__main__":
+    # Development server; run scripts/serve.py in production
+    create_app()
     init_db()
     app.run(debug=True)
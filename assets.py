@@ -0,0 +1,124 @@
+"""Fingerprinted CSS/JS with precompressed variants, and cache headers for uploads.
+
+At startup every file under static/css and static/js is read once, hashed and
+compressed (gzip, plus brotli when the `brotli` package is installed). url_for
+then hands out `css/style.<hash>.css`. That name changes whenever the bytes do,
+so it can be cached as immutable for a year. The compressed bodies are served
+from memory, picked by the request's Accept-Encoding.
+
+Uploads are stored under their content hash (see images.save_upload), and so are
+their derivatives, so those names are immutable too. Anything else, such as the
+seed images or old upload names, is revalidated with its ETag. Both kinds go
+through send_file, which handles Range requests and 304s.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import Response, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip alone is used without brotli
+    brotli = None
+
+FINGERPRINT_DIRS = ("css", "js")
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Files smaller than this are sent as is; compression would barely help
+MIN_COMPRESS_SIZE = 512
+# <32 hex chars>.<ext> from save_upload, optionally with a -<size> suffix for derivatives
+_CONTENT_ADDRESSED = re.compile(r"^(?:uploads/)?(?:derived/)?[0-9a-f]{32}(?:-[a-z]+)?\.[a-z0-9]+$")
+
+
+class Asset:
+    def __init__(self, path, data):
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        self.mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.digest = hashlib.sha256(data).hexdigest()[:12]
+        self.bodies = {None: data}
+        if len(data) >= MIN_COMPRESS_SIZE:
+            # mtime=0 keeps the gzip output identical across restarts and workers
+            self.bodies["gzip"] = gzip.compress(data, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.bodies["br"] = brotli.compress(data, quality=11)
+
+    def choose(self, accept_encodings):
+        """Smallest body the client accepts: brotli, then gzip, then identity."""
+        for encoding in ("br", "gzip"):
+            if encoding in self.bodies and accept_encodings[encoding]:
+                return encoding
+        return None
+
+
+class AssetManifest:
+    """Maps logical static names (css/style.css) to fingerprinted ones and back."""
+
+    def __init__(self, static_folder, dirs=FINGERPRINT_DIRS):
+        self.static_folder = static_folder
+        self.dirs = dirs
+        self.hashed = {}  # logical name -> fingerprinted name
+        self.assets = {}  # logical or fingerprinted name -> Asset
+        self.build()
+
+    def build(self):
+        hashed, assets = {}, {}
+        for subdir in self.dirs:
+            root = os.path.join(self.static_folder, subdir)
+            for dirpath, _, filenames in os.walk(root):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    with open(path, "rb") as f:
+                        asset = Asset(path, f.read())
+                    logical = os.path.relpath(path, self.static_folder).replace(os.sep, "/")
+                    stem, ext = os.path.splitext(logical)
+                    name = "%s.%s%s" % (stem, asset.digest, ext)
+                    hashed[logical] = name
+                    assets[logical] = assets[name] = asset
+        self.hashed, self.assets = hashed, assets
+
+    def stale(self):
+        """True once any fingerprinted file was edited, added or removed (used in debug mode)."""
+        for logical in self.hashed:
+            asset = self.assets[logical]
+            if not os.path.exists(asset.path) or os.path.getmtime(asset.path) != asset.mtime:
+                return True
+        return False
+
+    def url_name(self, filename):
+        return self.hashed.get(filename, filename)
+
+    def response(self, filename, request):
+        """Serve a fingerprinted or logical asset from memory, or None if it is not one."""
+        asset = self.assets.get(filename)
+        if asset is None:
+            return None
+        encoding = asset.choose(request.accept_encodings)
+        response = Response(asset.bodies[encoding], mimetype=asset.mimetype)
+        if encoding:
+            response.content_encoding = encoding
+        response.vary.add("Accept-Encoding")
+        response.set_etag("%s-%s" % (asset.digest, encoding or "identity"))
+        if filename in self.hashed:
+            # The logical name can change contents, so it is only revalidated
+            response.cache_control.no_cache = True
+        else:
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        return response.make_conditional(request)
+
+
+def send_static(directory, filename):
+    """send_from_directory with a year-long immutable lifetime for content-addressed files.
+
+    Other files are sent with no-cache, so browsers revalidate with If-None-Match
+    or If-Modified-Since and get a 304.
+    """
+    immutable = _CONTENT_ADDRESSED.match(filename) is not None
+    response = send_from_directory(directory, filename, max_age=IMMUTABLE_MAX_AGE if immutable else None)
+    if immutable:
+        response.cache_control.immutable = True
+    return response
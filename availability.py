@@ -0,0 +1,206 @@
+"""Hourly occupancy index for workspace bookings.
+
+Each (workspace, day) pair has one row in `workspace_occupancy` whose `hours_mask`
+has bit N set when the hour starting at N:00 is booked. Checking a new booking or
+answering "what is free on this day" is a primary-key lookup instead of a scan
+over `bookings`.
+"""
+from datetime import date, datetime, timedelta
+
+# Start times offered by the booking form (06:00 - 22:00)
+OPEN_HOUR = 6
+LAST_START_HOUR = 22
+# Longest booking the form accepts (one week)
+MAX_BOOKING_HOURS = 24 * 7
+MAX_RANGE_DAYS = 62
+QUERY_USAGE = "use ?date=YYYY-MM-DD or ?start=YYYY-MM-DD&days=N (max %d)" % MAX_RANGE_DAYS
+
+OCCUPANCY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS workspace_occupancy (
+        workspace_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        hours_mask INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (workspace_id, day)
+    ) WITHOUT ROWID;
+"""
+
+
+class BookingConflict(Exception):
+    """Raised when a booking overlaps hours that are already taken."""
+
+
+def split_booking(booking_date, start_hour, hours):
+    """Split a booking into [(day, mask), ...], spilling past midnight into the next day.
+
+    Raises ValueError for a malformed date or one that runs past 9999-12-31.
+    """
+    day = date.fromisoformat(booking_date)
+    spans = []
+    hour = start_hour
+    remaining = hours
+    while remaining > 0:
+        chunk = min(remaining, 24 - hour)
+        mask = ((1 << chunk) - 1) << hour
+        spans.append((day.isoformat(), mask))
+        remaining -= chunk
+        hour = 0
+        if remaining > 0:
+            try:
+                day += timedelta(days=1)
+            except OverflowError:
+                raise ValueError("booking runs past the last supported date")
+    return spans
+
+
+def mask_to_hours(mask):
+    return [h for h in range(24) if mask >> h & 1]
+
+
+def book_slot(conn, user_id, workspace_id, booking_date, start_time, hours, total_price, created_at=None,
+              idempotency_key=None):
+    """Insert a booking unless it overlaps an existing one, in a single write transaction.
+
+    Returns the new booking id, or raises BookingConflict.
+    """
+    # IMMEDIATE takes the write lock up front, so two requests can't both pass the check
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        booking_id = insert_booking(
+            conn, user_id, workspace_id, booking_date, start_time, hours, total_price, created_at, idempotency_key
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return booking_id
+
+
+def insert_booking(conn, user_id, workspace_id, booking_date, start_time, hours, total_price, created_at=None,
+                   idempotency_key=None):
+    """The body of book_slot, for callers that already hold the write lock (see writes.py).
+
+    A booking already made by this user with the same idempotency key is not
+    repeated; its id is returned instead.
+    """
+    if idempotency_key is not None:
+        row = conn.execute(
+            "SELECT id FROM bookings WHERE user_id = ? AND idempotency_key = ?", (user_id, idempotency_key)
+        ).fetchone()
+        if row is not None:
+            return row[0]
+    start_hour = int(start_time.split(":", 1)[0])
+    spans = split_booking(booking_date, start_hour, hours)
+    for day, mask in spans:
+        row = conn.execute(
+            "SELECT hours_mask FROM workspace_occupancy WHERE workspace_id = ? AND day = ?",
+            (workspace_id, day),
+        ).fetchone()
+        if row is not None and row[0] & mask:
+            raise BookingConflict(day)
+    for day, mask in spans:
+        conn.execute(
+            """
+            INSERT INTO workspace_occupancy (workspace_id, day, hours_mask) VALUES (?, ?, ?)
+            ON CONFLICT(workspace_id, day) DO UPDATE SET hours_mask = hours_mask | excluded.hours_mask
+            """,
+            (workspace_id, day, mask),
+        )
+    cur = conn.execute(
+        """
+        INSERT INTO bookings (user_id, workspace_id, booking_date, start_time, hours, total_price, created_at,
+                              idempotency_key)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            user_id,
+            workspace_id,
+            booking_date,
+            start_time,
+            hours,
+            total_price,
+            created_at or datetime.utcnow().isoformat(),
+            idempotency_key,
+        ),
+    )
+    return cur.lastrowid
+
+
+def _day_entry(mask):
+    booked = mask_to_hours(mask)
+    free = [h for h in range(OPEN_HOUR, LAST_START_HOUR + 1) if not mask >> h & 1]
+    return {
+        "booked": ["%02d:00" % h for h in booked],
+        "free": ["%02d:00" % h for h in free],
+    }
+
+
+def day_availability(conn, workspace_id, day):
+    row = conn.execute(
+        "SELECT hours_mask FROM workspace_occupancy WHERE workspace_id = ? AND day = ?",
+        (workspace_id, day),
+    ).fetchone()
+    return _day_entry(row[0] if row else 0)
+
+
+def range_availability(conn, workspace_id, start_day, days):
+    """Availability for `days` consecutive days starting at `start_day`, keyed by ISO date.
+
+    Raises ValueError for a malformed date or a range that runs past 9999-12-31.
+    """
+    start = date.fromisoformat(start_day)
+    try:
+        end = start + timedelta(days=days - 1)
+    except OverflowError:
+        raise ValueError("range runs past the last supported date")
+    masks = dict(
+        conn.execute(
+            "SELECT day, hours_mask FROM workspace_occupancy WHERE workspace_id = ? AND day BETWEEN ? AND ?",
+            (workspace_id, start.isoformat(), end.isoformat()),
+        ).fetchall()
+    )
+    result = {}
+    for i in range(days):
+        day = (start + timedelta(days=i)).isoformat()
+        result[day] = _day_entry(masks.get(day, 0))
+    return result
+
+
+def query_availability(conn, workspace_id, args, today):
+    """The availability payload for ?date= (default `today`) or ?start=&days= in `args`.
+
+    Raises ValueError for a malformed date, a bad day count or a range out of bounds;
+    QUERY_USAGE explains the accepted forms.
+    """
+    if "start" in args:
+        days = int(args.get("days", "7"))
+        if days < 1 or days > MAX_RANGE_DAYS:
+            raise ValueError("days must be between 1 and %d" % MAX_RANGE_DAYS)
+        return {"workspace_id": workspace_id, "days": range_availability(conn, workspace_id, args["start"], days)}
+    day = args.get("date") or today
+    datetime.strptime(day, "%Y-%m-%d")
+    return {"workspace_id": workspace_id, "date": day, **day_availability(conn, workspace_id, day)}
+
+
+def rebuild_occupancy(conn, commit=True):
+    """Recompute every occupancy mask from the bookings table (used for existing databases)."""
+    masks = {}
+    rows = conn.execute(
+        "SELECT workspace_id, booking_date, start_time, hours FROM bookings "
+        "WHERE booking_date IS NOT NULL AND start_time IS NOT NULL"
+    )
+    for workspace_id, booking_date, start_time, hours in rows:
+        try:
+            spans = split_booking(booking_date, int(start_time.split(":", 1)[0]), hours)
+        except ValueError:
+            continue
+        for day, mask in spans:
+            key = (workspace_id, day)
+            masks[key] = masks.get(key, 0) | mask
+    conn.execute("DELETE FROM workspace_occupancy")
+    conn.executemany(
+        "INSERT INTO workspace_occupancy (workspace_id, day, hours_mask) VALUES (?, ?, ?)",
+        [(ws, day, mask) for (ws, day), mask in masks.items()],
+    )
+    if commit:
+        conn.commit()
+    return len(masks)
@@ -0,0 +1,14 @@
+"""Synthetic data generation and load testing for the app.
+
+    python -m benchmark generate --db /tmp/bench.db --users 2000 --workspaces 20000
+    python -m benchmark run --db /tmp/bench.db --concurrency 8 --seconds 20 --out before.json
+    python -m benchmark compare before.json after.json
+    python -m benchmark writes --concurrency 16 --synchronous FULL
+    python -m benchmark near --workspaces 100000
+
+`generate` fills a fresh database through the normal migrations, `run` drives
+every route and reports throughput and p50/p95/p99 per endpoint as JSON, and
+`compare` prints the change between two such reports. `writes` measures booking
+and review inserts per second with per-request commits and with the group-commit
+queue. `near` times near-me lookups against a full-table distance scan.
+"""
@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import app as cowork
+from benchmark import datagen, driver, geo, writes
+
+
+def cmd_generate(args):
+    if os.path.exists(args.db):
+        if not args.force:
+            print("Database already exists (use --force to replace it):", args.db)
+            return 1
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+    # Plain connection: bulk inserts shouldn't be charged to request metrics or slow-query logged
+    conn = cowork.connect_db(args.db, factory=sqlite3.Connection)
+    conn.execute("PRAGMA journal_mode = WAL")
+    started = time.perf_counter()
+    timings = datagen.generate(
+        conn, users=args.users, workspaces=args.workspaces, bookings=args.bookings, reviews=args.reviews,
+        seed=args.seed, password_method=cowork.app.config["PASSWORD_HASH_METHOD"],
+    )
+    conn.close()
+    print(json.dumps({
+        "db": args.db,
+        "seconds": round(time.perf_counter() - started, 2),
+        "tables": {table: {"rows": rows, "seconds": seconds} for table, (rows, seconds) in timings.items()},
+    }, indent=2))
+    return 0
+
+
+def cmd_run(args):
+    if not os.path.exists(args.db):
+        print("Database file not found (create one with `python -m benchmark generate`):", args.db)
+        return 1
+    conn = cowork.connect_db(args.db, factory=sqlite3.Connection)
+    ctx = {
+        "workspace_ids": [row[0] for row in conn.execute("SELECT id FROM workspaces")],
+        "users": conn.execute("SELECT COUNT(*) FROM users").fetchone()[0],
+    }
+    conn.close()
+
+    server = None
+    if args.url:
+        base_url = args.url
+    else:
+        cowork.create_app({
+            "DATABASE": args.db,
+            "CACHE_ENABLED": not args.no_cache,
+            # Every worker logs in from the same address; don't let the limiter skew results
+            "LOGIN_ATTEMPTS_PER_IP": 10 ** 9,
+            "LOGIN_ATTEMPTS_PER_ACCOUNT": 10 ** 9,
+        })
+        cowork.init_db()
+        if args.mode == "server":
+            server, base_url = driver.start_server(cowork.app)
+
+    if args.url or server is not None:
+        def make_session():
+            return driver.HttpSession(base_url)
+    else:
+        def make_session():
+            return driver.ClientSession(cowork.app)
+
+    try:
+        result = driver.run(
+            make_session, ctx, concurrency=args.concurrency, seconds=args.seconds, warmup=args.warmup,
+            writes=not args.read_only, only=set(args.only.split(",")) if args.only else None, seed=args.seed,
+        )
+    finally:
+        if server is not None:
+            server.shutdown()
+        if not args.url:
+            cowork.get_hasher().shutdown()
+
+    report = {
+        "commit": driver.git_commit(os.path.dirname(os.path.abspath(cowork.__file__))),
+        "started_at": datetime.utcnow().replace(microsecond=0).isoformat(),
+        "config": {
+            "mode": "url" if args.url else args.mode,
+            "concurrency": args.concurrency,
+            "seconds": args.seconds,
+            "read_only": args.read_only,
+            "cache": None if args.url else not args.no_cache,
+            "workspaces": len(ctx["workspace_ids"]),
+            "users": ctx["users"],
+            "cpus": os.cpu_count(),
+        },
+        **result,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    return 0
+
+
+def cmd_writes(args):
+    results = []
+    for mode in args.modes.split(","):
+        # A fresh database per mode, so both start from the same empty tables
+        with tempfile.TemporaryDirectory() as tmp:
+            connect = writes.connector(cowork.connect_db, os.path.join(tmp, "writes.db"), args.synchronous)
+            writes.prepare(connect, users=args.users, workspaces=args.workspaces)
+            results.append(writes.run(
+                connect, mode, concurrency=args.concurrency, writes_per_worker=args.writes,
+                users=args.users, workspaces=args.workspaces, seed=args.seed,
+            ))
+    report = {
+        "commit": driver.git_commit(os.path.dirname(os.path.abspath(cowork.__file__))),
+        "config": {
+            "concurrency": args.concurrency, "writes_per_worker": args.writes,
+            "synchronous": args.synchronous, "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    return 0
+
+
+def cmd_near(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db
+        if path is None:
+            path = os.path.join(tmp, "near.db")
+            conn = cowork.connect_db(path, factory=sqlite3.Connection)
+            conn.execute("PRAGMA journal_mode = WAL")
+            datagen.generate(conn, users=100, workspaces=args.workspaces, bookings=0, reviews=0, seed=args.seed)
+            conn.close()
+        conn = cowork.connect_db(path, factory=sqlite3.Connection)
+        result = geo.run(conn, count=args.queries, naive_count=args.naive_queries, seed=args.seed)
+        conn.close()
+    print(json.dumps({
+        "commit": driver.git_commit(os.path.dirname(os.path.abspath(cowork.__file__))),
+        **result,
+    }, indent=2))
+    return 0
+
+
+def cmd_compare(args):
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    print("%s -> %s" % (before.get("commit"), after.get("commit")))
+    print("%-24s %10s %10s %8s %10s %10s %8s" % ("endpoint", "rps", "rps", "change", "p95 ms", "p95 ms", "change"))
+    for row in driver.compare(before, after):
+        name, *values = row
+        print("%-24s %10s %10s %8s %10s %10s %8s" % (
+            name, *["-" if v is None else ("%+.1f%%" % v if i in (2, 5) else v) for i, v in enumerate(values)]
+        ))
+    return 0
+
+
+def main():
+    default_db = os.path.join(os.path.dirname(os.path.abspath(cowork.__file__)), "bench.db")
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description="Generate data and load-test the app.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="create a database filled with synthetic data")
+    gen.add_argument("--db", default=default_db)
+    gen.add_argument("--users", type=int, default=1000)
+    gen.add_argument("--workspaces", type=int, default=5000)
+    gen.add_argument("--bookings", type=int, default=20000)
+    gen.add_argument("--reviews", type=int, default=20000)
+    gen.add_argument("--seed", type=int, default=1)
+    gen.add_argument("--force", action="store_true", help="replace an existing database")
+    gen.set_defaults(func=cmd_generate)
+
+    run = commands.add_parser("run", help="drive the routes and report per-endpoint latency as JSON")
+    run.add_argument("--db", default=default_db)
+    run.add_argument("--mode", choices=("client", "server"), default="client",
+                     help="Flask test client in-process, or real HTTP to a local threaded server")
+    run.add_argument("--url", help="load-test an already running server instead (uses --db only for ids)")
+    run.add_argument("--concurrency", type=int, default=4)
+    run.add_argument("--seconds", type=float, default=10.0)
+    run.add_argument("--warmup", type=float, default=2.0)
+    run.add_argument("--read-only", action="store_true", help="skip the routes that write (bookings, reviews, sign-ups, new listings)")
+    run.add_argument("--only", help="comma-separated route names: %s" % ",".join(r.name for r in driver.ROUTES))
+    run.add_argument("--no-cache", action="store_true", help="disable the query cache (in-process modes)")
+    run.add_argument("--seed", type=int, default=7)
+    run.add_argument("--out", help="also write the JSON report to this file")
+    run.set_defaults(func=cmd_run)
+
+    wr = commands.add_parser("writes", help="booking/review writes per second: per-request commits vs. group commit")
+    wr.add_argument("--modes", default=",".join(writes.MODES))
+    wr.add_argument("--concurrency", type=int, default=16)
+    wr.add_argument("--writes", type=int, default=200, help="writes per worker")
+    wr.add_argument("--users", type=int, default=64)
+    wr.add_argument("--workspaces", type=int, default=500)
+    wr.add_argument("--synchronous", choices=("OFF", "NORMAL", "FULL"), default="NORMAL",
+                    help="fsync level; the app runs NORMAL, FULL fsyncs every commit")
+    wr.add_argument("--seed", type=int, default=7)
+    wr.add_argument("--out", help="also write the JSON report to this file")
+    wr.set_defaults(func=cmd_writes)
+
+    near = commands.add_parser("near", help="near-me lookups: R*Tree vs. a full-table haversine scan")
+    near.add_argument("--db", help="use this database instead of generating one")
+    near.add_argument("--workspaces", type=int, default=100000, help="listings to generate (without --db)")
+    near.add_argument("--queries", type=int, default=200)
+    near.add_argument("--naive-queries", type=int, default=20, help="the full scan is slow; time fewer of them")
+    near.add_argument("--seed", type=int, default=3)
+    near.set_defaults(func=cmd_near)
+
+    cmp = commands.add_parser("compare", help="compare two JSON reports")
+    cmp.add_argument("before")
+    cmp.add_argument("after")
+    cmp.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""Bulk-generate realistic users, workspaces, bookings and reviews.
+
+Each table is filled with batched executemany() calls inside one transaction,
+with the same triggers the app relies on (review aggregates, search index), so
+the result looks exactly like a database the app built itself.
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+import availability
+import migrations
+
+BATCH = 5000
+# Every generated user logs in with this password
+PASSWORD = "bench-password"
+
+CITIES = {
+    "USD": ("New York", "Austin", "Seattle", "Chicago", "Denver", "Boston", "Portland"),
+    "INR": ("Bengaluru", "Delhi", "Mumbai", "Hyderabad", "Pune", "Chennai", "Kolkata"),
+}
+CITY_CENTRES = {
+    "New York": (40.7128, -74.0060), "Austin": (30.2672, -97.7431), "Seattle": (47.6062, -122.3321),
+    "Chicago": (41.8781, -87.6298), "Denver": (39.7392, -104.9903), "Boston": (42.3601, -71.0589),
+    "Portland": (45.5152, -122.6784), "Bengaluru": (12.9716, 77.5946), "Delhi": (28.6139, 77.2090),
+    "Mumbai": (19.0760, 72.8777), "Hyderabad": (17.3850, 78.4867), "Pune": (18.5204, 73.8567),
+    "Chennai": (13.0827, 80.2707), "Kolkata": (22.5726, 88.3639),
+}
+# Standard deviation of a listing's distance from its city centre, in degrees (~9 km)
+CITY_SPREAD = 0.08
+KINDS = ("Desk", "Loft", "Meeting Room", "Focus Pod", "Studio", "Hub", "Suite", "Hot Desk")
+ADJECTIVES = ("Quiet", "Sunny", "Modern", "Cozy", "Creative", "Downtown", "Riverside", "Rooftop")
+FEATURES = (
+    "fast Wi-Fi", "ergonomic chairs", "a whiteboard wall", "natural light", "a projector",
+    "standing desks", "a coffee bar", "phone booths", "bike parking", "24/7 access",
+    "a quiet zone", "video-call setup", "lockers", "a terrace", "printing",
+)
+COMMENTS = (
+    "Great place to get work done.", "A bit noisy in the afternoon.", "Fast internet and friendly staff.",
+    "Would book again.", "Chairs could be better.", "Perfect for client calls.", None,
+)
+
+
+def _batched(rows, size=BATCH):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(conn, sql, rows):
+    count = 0
+    conn.execute("BEGIN")
+    try:
+        for batch in _batched(rows):
+            conn.executemany(sql, batch)
+            count += len(batch)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return count
+
+
+def _users(count, pwhash):
+    for i in range(1, count + 1):
+        yield ("user%d" % i, "user%d@example.com" % i, pwhash)
+
+
+def _workspaces(rnd, count, users):
+    for i in range(count):
+        currency = "INR" if rnd.random() < 0.5 else "USD"
+        city = rnd.choice(CITIES[currency])
+        kind = rnd.choice(KINDS)
+        name = "%s %s %s %d" % (city, rnd.choice(ADJECTIVES), kind, i + 1)
+        description = "%s in %s with %s and %s." % (kind, city, *rnd.sample(FEATURES, 2))
+        if currency == "USD":
+            price = round(rnd.uniform(5, 60), 2)
+        else:
+            price = float(rnd.randrange(200, 2500, 50))
+        rating = round(rnd.uniform(3.0, 5.0), 1) if rnd.random() > 0.1 else None
+        owner = rnd.randint(1, users) if users and rnd.random() < 0.7 else None
+        lat, lon = CITY_CENTRES[city]
+        yield (name, description, price, rating, currency, owner,
+               round(rnd.gauss(lat, CITY_SPREAD), 6), round(rnd.gauss(lon, CITY_SPREAD), 6))
+
+
+def _bookings(rnd, count, users, prices, today):
+    workspace_ids = list(prices)
+    taken = set()
+    made = 0
+    while made < count:
+        workspace_id = rnd.choice(workspace_ids)
+        day = today + timedelta(days=rnd.randint(-180, 60))
+        start = rnd.randint(availability.OPEN_HOUR, 20)
+        hours = rnd.choice((1, 1, 2, 2, 3, 4, 8))
+        hours = min(hours, 24 - start)
+        slots = [(workspace_id, day, h) for h in range(start, start + hours)]
+        if any(s in taken for s in slots):
+            continue
+        taken.update(slots)
+        made += 1
+        # Booked up to a month ahead of the day itself
+        created = datetime.combine(day, datetime.min.time()) - timedelta(
+            days=rnd.randint(0, 30), seconds=rnd.randint(0, 86399)
+        )
+        yield (
+            rnd.randint(1, users), workspace_id, day.isoformat(), "%02d:00" % start,
+            hours, round(hours * prices[workspace_id], 2), created.isoformat(),
+        )
+
+
+def _reviews(rnd, count, users, workspace_ids, now):
+    for _ in range(count):
+        created = now - timedelta(days=rnd.randint(0, 365), seconds=rnd.randint(0, 86399))
+        rating = rnd.choices((1, 2, 3, 4, 5), weights=(1, 2, 5, 12, 10))[0]
+        yield (rnd.randint(1, users), rnd.choice(workspace_ids), rating, rnd.choice(COMMENTS), created.isoformat())
+
+
+def generate(conn, users=1000, workspaces=5000, bookings=20000, reviews=20000, seed=1, password_method=None):
+    """Fill a freshly migrated database; returns {table: (rows, seconds)}."""
+    rnd = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    migrations.migrate(conn)
+    timings = {}
+
+    def timed(table, sql, rows):
+        started = time.perf_counter()
+        timings[table] = (_insert(conn, sql, rows), round(time.perf_counter() - started, 3))
+
+    # One hash for everyone: hashing per user would dominate generation time
+    if password_method:
+        pwhash = generate_password_hash(PASSWORD, method=password_method)
+    else:
+        pwhash = generate_password_hash(PASSWORD)
+    timed("users", "INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)",
+          _users(users, pwhash))
+    timed(
+        "workspaces",
+        "INSERT INTO workspaces (name, description, price_per_hour, rating, currency, owner_id, latitude, longitude) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        _workspaces(rnd, workspaces, users),
+    )
+    prices = dict(conn.execute("SELECT id, price_per_hour FROM workspaces"))
+    timed(
+        "bookings",
+        "INSERT INTO bookings (user_id, workspace_id, booking_date, start_time, hours, total_price, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        _bookings(rnd, bookings, users, prices, now.date()),
+    )
+    started = time.perf_counter()
+    availability.rebuild_occupancy(conn)
+    timings["workspace_occupancy"] = (
+        conn.execute("SELECT COUNT(*) FROM workspace_occupancy").fetchone()[0],
+        round(time.perf_counter() - started, 3),
+    )
+    timed(
+        "reviews",
+        "INSERT INTO reviews (user_id, workspace_id, rating, comment, created_at) VALUES (?, ?, ?, ?, ?)",
+        _reviews(rnd, reviews, users, list(prices), now),
+    )
+    conn.execute("ANALYZE")
+    conn.commit()
+    return timings
@@ -0,0 +1,299 @@
+"""Drive the app's routes at a fixed concurrency and report per-endpoint latency.
+
+Workers either call the app in-process through the Flask test client ("client"),
+go over real HTTP to a threaded WSGI server started on localhost ("server"), or
+hit an already running deployment given by URL. Every worker logs in as its own
+generated user, then picks routes from a weighted mix until time runs out.
+"""
+import http.client
+import random
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from benchmark import datagen
+
+Route = namedtuple("Route", "name weight write needs_login build")
+
+SEARCH_TERMS = ("loft", "quiet", "Bengaluru", "meeting room", "wi-fi", "projector", "Seattle studio", "coffee")
+
+
+def _explore(rnd, ctx):
+    args = {}
+    if rnd.random() < 0.5:
+        args["sort"] = rnd.choice(("rating", "price", "newest"))
+    if rnd.random() < 0.4:
+        args["currency"] = rnd.choice(("USD", "INR"))
+    if rnd.random() < 0.2:
+        args["min_rating"] = rnd.choice(("3.5", "4.0", "4.5"))
+    return "GET", "/explore" + ("?" + urlencode(args) if args else ""), None
+
+
+def _explore_near(rnd, ctx):
+    lat, lon = datagen.CITY_CENTRES[rnd.choice(sorted(datagen.CITY_CENTRES))]
+    args = {
+        "near": "%.4f,%.4f" % (rnd.gauss(lat, datagen.CITY_SPREAD), rnd.gauss(lon, datagen.CITY_SPREAD)),
+        "radius_km": rnd.choice(("2", "5", "10")),
+    }
+    return "GET", "/explore?" + urlencode(args), None
+
+
+def _day(rnd, ahead=30):
+    return (date.today() + timedelta(days=rnd.randint(0, ahead))).isoformat()
+
+
+def _register(rnd, ctx):
+    # Random names, so concurrent workers and repeated runs don't collide
+    name = "bench%012x" % rnd.getrandbits(48)
+    return "POST", "/register", {
+        "username": name, "email": "%s@example.com" % name, "password": datagen.PASSWORD, "confirm": datagen.PASSWORD,
+    }
+
+
+def _new_workspace(rnd, ctx):
+    return "POST", "/workspaces/new", {
+        "name": "Benchmark space %d" % rnd.randint(1, 10 ** 6),
+        "description": "Created by the benchmark",
+        "price": "%.2f" % rnd.uniform(5, 60),
+    }
+
+
+def _api_workspaces(rnd, ctx):
+    if rnd.random() < 0.3:
+        ids = rnd.sample(ctx["workspace_ids"], min(20, len(ctx["workspace_ids"])))
+        return "GET", "/api/v1/workspaces?" + urlencode({"ids": ",".join(map(str, ids))}), None
+    method, path, data = _explore(rnd, ctx)
+    return method, path.replace("/explore", "/api/v1/workspaces", 1), data
+
+
+ROUTES = (
+    Route("index", 5, False, False, lambda rnd, ctx: ("GET", "/", None)),
+    Route("explore", 25, False, False, _explore),
+    Route("explore_near", 5, False, False, _explore_near),
+    Route("search", 10, False, False,
+          lambda rnd, ctx: ("GET", "/search?" + urlencode({"q": rnd.choice(SEARCH_TERMS)}), None)),
+    Route("workspace_detail", 25, False, False,
+          lambda rnd, ctx: ("GET", "/workspace/%d" % rnd.choice(ctx["workspace_ids"]), None)),
+    Route("workspace_availability", 10, False, False,
+          lambda rnd, ctx: ("GET", "/workspace/%d/availability?date=%s" % (rnd.choice(ctx["workspace_ids"]), _day(rnd)), None)),
+    Route("workspace_reviews", 5, False, False,
+          lambda rnd, ctx: ("GET", "/workspace/%d/reviews" % rnd.choice(ctx["workspace_ids"]), None)),
+    Route("dashboard", 10, False, True, lambda rnd, ctx: ("GET", "/dashboard", None)),
+    Route("host", 3, False, True,
+          lambda rnd, ctx: ("GET", "/host?grain=%s" % rnd.choice(("day", "week", "month")), None)),
+    Route("host_stats", 2, False, True,
+          lambda rnd, ctx: ("GET", "/host/stats?grain=%s" % rnd.choice(("day", "week", "month")), None)),
+    Route("api_workspaces", 8, False, False, _api_workspaces),
+    Route("api_workspace", 8, False, False,
+          lambda rnd, ctx: ("GET", "/api/v1/workspaces/%d" % rnd.choice(ctx["workspace_ids"]), None)),
+    Route("api_reviews", 4, False, False,
+          lambda rnd, ctx: ("GET", "/api/v1/workspaces/%d/reviews" % rnd.choice(ctx["workspace_ids"]), None)),
+    Route("api_availability", 4, False, False, lambda rnd, ctx: (
+        "GET", "/api/v1/workspaces/%d/availability?start=%s&days=7" % (rnd.choice(ctx["workspace_ids"]), _day(rnd)), None,
+    )),
+    Route("api_my_bookings", 3, False, True, lambda rnd, ctx: (
+        "GET", "/api/v1/me/bookings?view=%s" % rnd.choice(("upcoming", "past")), None,
+    )),
+    Route("book", 3, True, True, lambda rnd, ctx: (
+        "POST", "/workspace/%d" % rnd.choice(ctx["workspace_ids"]),
+        {"booking_date": _day(rnd, 90), "start_time": "%02d:00" % rnd.randint(6, 20), "hours": str(rnd.randint(1, 3))},
+    )),
+    Route("review", 2, True, True, lambda rnd, ctx: (
+        "POST", "/workspace/%d/review" % rnd.choice(ctx["workspace_ids"]),
+        {"rating": str(rnd.randint(1, 5)), "comment": "Benchmark review"},
+    )),
+    Route("login", 1, False, False, lambda rnd, ctx: (
+        "POST", "/login", {"username": "user%d" % rnd.randint(1, ctx["users"]), "password": datagen.PASSWORD},
+    )),
+    Route("register", 1, True, False, _register),
+    Route("new_workspace", 1, True, True, _new_workspace),
+)
+
+
+class ClientSession:
+    """In-process requests through the Flask test client."""
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, data=None):
+        return self._client.open(path, method=method, data=data).status_code
+
+
+class HttpSession:
+    """Keep-alive HTTP/1.1 connection with a minimal cookie jar; redirects are not followed."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self._conn_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self._netloc = parts.netloc
+        self._prefix = parts.path.rstrip("/")
+        self._conn = None
+        self._cookies = {}
+
+    def request(self, method, path, data=None):
+        headers = {}
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if self._cookies:
+            headers["Cookie"] = "; ".join("%s=%s" % item for item in self._cookies.items())
+        for attempt in (1, 2):
+            if self._conn is None:
+                self._conn = self._conn_class(self._netloc, timeout=30)
+            try:
+                self._conn.request(method, self._prefix + path, body=body, headers=headers)
+                resp = self._conn.getresponse()
+                resp.read()
+                break
+            except (http.client.HTTPException, OSError):
+                # The server may close an idle keep-alive connection; retry once on a new one
+                self._conn.close()
+                self._conn = None
+                if attempt == 2:
+                    raise
+        for header in resp.headers.get_all("Set-Cookie") or ():
+            for name, morsel in SimpleCookie(header).items():
+                self._cookies[name] = morsel.value
+        return resp.status
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 2)
+
+
+def summarize(samples, errors, seconds):
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / seconds, 1),
+        "mean_ms": round(sum(samples) / len(samples), 2) if samples else None,
+        "p50_ms": percentile(samples, 50),
+        "p95_ms": percentile(samples, 95),
+        "p99_ms": percentile(samples, 99),
+    }
+
+
+def git_commit(cwd=None):
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=cwd, capture_output=True, text=True, timeout=5
+        )
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def run(make_session, ctx, concurrency=4, seconds=10.0, warmup=2.0, writes=True, only=None, seed=7):
+    """Run the load; returns {"endpoints": {...}, "total": {...}}.
+
+    `make_session()` returns an object with request(method, path, data) -> status.
+    Statuses of 400 and up count as errors; redirects are normal responses here.
+    """
+    routes = [r for r in ROUTES if (writes or not r.write) and (not only or r.name in only)]
+    if not routes:
+        raise ValueError("no routes selected")
+    samples = {r.name: [] for r in routes}
+    errors = {r.name: 0 for r in routes}
+    lock = threading.Lock()
+    window = {}
+
+    def open_window():
+        # Runs once every worker has logged in, so slow logins don't eat the warm-up
+        window["start"] = time.perf_counter() + warmup
+        window["stop"] = window["start"] + seconds
+
+    ready = threading.Barrier(concurrency + 1, action=open_window)
+
+    def worker(index):
+        rnd = random.Random(seed * 1000 + index)
+        try:
+            session = make_session()
+            user = (index % ctx["users"]) + 1
+            status = session.request("POST", "/login", {"username": "user%d" % user, "password": datagen.PASSWORD})
+        except BaseException:
+            ready.abort()
+            raise
+        logged_in = status in (301, 302, 303)
+        mine = {r.name: [] for r in routes}
+        failed = {r.name: 0 for r in routes}
+        usable = [r for r in routes if logged_in or not r.needs_login]
+        ready.wait()
+        start, stop = window["start"], window["stop"]
+        while usable:
+            route = rnd.choices(usable, [r.weight for r in usable])[0]
+            method, path, data = route.build(rnd, ctx)
+            began = time.perf_counter()
+            if began >= stop:
+                break
+            try:
+                status = session.request(method, path, data)
+            except Exception:
+                status = 599
+            elapsed = (time.perf_counter() - began) * 1000
+            if began < start:
+                continue
+            mine[route.name].append(elapsed)
+            if status >= 400:
+                failed[route.name] += 1
+        with lock:
+            for name in mine:
+                samples[name].extend(mine[name])
+                errors[name] += failed[name]
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    for t in threads:
+        t.join()
+
+    endpoints = {name: summarize(samples[name], errors[name], seconds) for name in samples}
+    everything = [s for name in samples for s in samples[name]]
+    return {
+        "endpoints": endpoints,
+        "total": summarize(everything, sum(errors.values()), seconds),
+    }
+
+
+def start_server(app, host="127.0.0.1"):
+    """Serve `app` from a threaded werkzeug server on a free port; returns (server, base_url)."""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server(host, 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://%s:%d" % (host, server.server_port)
+
+
+def compare(before, after):
+    """Rows of (endpoint, rps before, rps after, rps change %, p95 before, p95 after, p95 change %)."""
+    rows = []
+    names = list(before["endpoints"]) + [n for n in after["endpoints"] if n not in before["endpoints"]]
+    for name in names + ["total"]:
+        old = before["total"] if name == "total" else before["endpoints"].get(name)
+        new = after["total"] if name == "total" else after["endpoints"].get(name)
+        if not old or not new:
+            continue
+        rows.append((
+            name, old["rps"], new["rps"], _change(old["rps"], new["rps"]),
+            old["p95_ms"], new["p95_ms"], _change(old["p95_ms"], new["p95_ms"]),
+        ))
+    return rows
+
+
+def _change(old, new):
+    if not old or new is None:
+        return None
+    return round((new - old) * 100.0 / old, 1)
@@ -0,0 +1,80 @@
+"""Near-me lookups: the R*Tree bounding-box path (geo.nearby_page) vs. a full-table haversine scan.
+
+Both answer the same queries over the same database: the nearest PAGE_SIZE
+workspaces within a radius of a point near one of the generated cities. The naive
+version computes the distance of every workspace in SQL and sorts. Results are
+compared so a speed-up never hides a wrong answer.
+"""
+import random
+import time
+
+import geo
+from benchmark import datagen
+from benchmark.driver import percentile
+from listings import LISTING_COLUMNS, PAGE_SIZE
+
+RADII_KM = (2.0, 5.0, 10.0, 25.0)
+
+
+def naive_page(conn, lat, lon, radius_km, limit=PAGE_SIZE):
+    """The query the index replaces: distance for every row, filter, sort."""
+    conn.create_function("haversine_km", 4, geo.haversine_km, deterministic=True)
+    rows = conn.execute(
+        f"""
+        SELECT * FROM (
+            SELECT {LISTING_COLUMNS}, haversine_km(?, ?, latitude, longitude) AS distance_km
+            FROM workspaces WHERE latitude IS NOT NULL
+        )
+        WHERE distance_km <= ?
+        ORDER BY distance_km, id
+        LIMIT ?
+        """,
+        (lat, lon, radius_km, limit),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def queries(count, seed=3):
+    rnd = random.Random(seed)
+    cities = sorted(datagen.CITY_CENTRES)
+    for _ in range(count):
+        lat, lon = datagen.CITY_CENTRES[rnd.choice(cities)]
+        yield rnd.gauss(lat, datagen.CITY_SPREAD), rnd.gauss(lon, datagen.CITY_SPREAD), rnd.choice(RADII_KM)
+
+
+def _timed(fn, points):
+    samples, results = [], []
+    for lat, lon, radius_km in points:
+        started = time.perf_counter()
+        results.append(fn(lat, lon, radius_km))
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples, results
+
+
+def _summary(samples):
+    return {
+        "mean_ms": round(sum(samples) / len(samples), 2),
+        "p50_ms": percentile(samples, 50),
+        "p95_ms": percentile(samples, 95),
+        "p99_ms": percentile(samples, 99),
+    }
+
+
+def run(conn, count=200, naive_count=None, seed=3):
+    """Time `count` indexed lookups and `naive_count` (default: count) naive ones on the same points."""
+    points = list(queries(count, seed))
+    naive_points = points[:naive_count or count]
+    indexed, indexed_results = _timed(lambda lat, lon, r: geo.nearby_page(conn, lat, lon, radius_km=r)[0], points)
+    naive, naive_results = _timed(lambda lat, lon, r: naive_page(conn, lat, lon, r), naive_points)
+    mismatches = sum(
+        [row["id"] for row in a] != [row["id"] for row in b] for a, b in zip(indexed_results, naive_results)
+    )
+    return {
+        "workspaces": conn.execute("SELECT COUNT(*) FROM workspaces_geo").fetchone()[0],
+        "queries": len(points),
+        "mean_results": round(sum(len(r) for r in indexed_results) / float(len(points)), 1),
+        "rtree": _summary(indexed),
+        "naive": _summary(naive),
+        "compared": len(naive_points),
+        "mismatches": mismatches,
+    }
@@ -0,0 +1,115 @@
+"""Booking and review write throughput: per-request commits vs. the group-commit queue.
+
+Each worker thread stands in for a request thread. It books a random hour on a
+random workspace, or posts a review one time in four, and waits for the answer.
+"direct" gives every worker its own connection and commits each write on its own,
+as the routes do by default. "queue" submits every write through one
+writes.WriteQueue, as the routes do with COWORK_WRITE_QUEUE=1.
+"""
+import random
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from functools import partial
+
+import availability
+import ratings
+import writes
+from benchmark import datagen
+from benchmark.driver import percentile
+
+MODES = ("direct", "queue")
+REVIEW_SHARE = 0.25
+
+
+def prepare(connect, users, workspaces, seed=1):
+    """Fill a fresh database with users and workspaces (no bookings or reviews)."""
+    conn = connect()
+    conn.execute("PRAGMA journal_mode = WAL")
+    datagen.generate(conn, users=users, workspaces=workspaces, bookings=0, reviews=0, seed=seed)
+    conn.close()
+
+
+def _operations(rnd, count, user_id, workspaces, today):
+    for i in range(count):
+        workspace_id = rnd.randint(1, workspaces)
+        key = "bench-%d-%d" % (user_id, i)
+        if rnd.random() < REVIEW_SHARE:
+            yield "review", (user_id, workspace_id, rnd.randint(1, 5), None, key)
+        else:
+            day = (today + timedelta(days=rnd.randint(1, 60))).isoformat()
+            start = "%02d:00" % rnd.randint(availability.OPEN_HOUR, availability.LAST_START_HOUR)
+            yield "booking", (user_id, workspace_id, day, start, 1, 10.0, None, key)
+
+
+def run(connect, mode, concurrency=16, writes_per_worker=200, users=64, workspaces=500, seed=7):
+    """Drive `concurrency` writers to completion; returns throughput, latency and conflict counts."""
+    if mode not in MODES:
+        raise ValueError("mode must be one of %s" % ", ".join(MODES))
+    queue = writes.WriteQueue(connect) if mode == "queue" else None
+    latencies = []
+    conflicts = [0]
+    lock = threading.Lock()
+    start_gate = threading.Barrier(concurrency + 1)
+    today = date.today()
+
+    def worker(index):
+        rnd = random.Random(seed * 1000 + index)
+        conn = connect() if queue is None else None
+        samples, lost = [], 0
+        ops = list(_operations(rnd, writes_per_worker, index % users + 1, workspaces, today))
+        start_gate.wait()
+        for kind, args in ops:
+            started = time.perf_counter()
+            try:
+                if queue is not None:
+                    if kind == "booking":
+                        queue.submit(availability.insert_booking, *args)
+                    else:
+                        queue.submit(partial(ratings.add_review, commit=False), *args)
+                elif kind == "booking":
+                    availability.book_slot(conn, *args)
+                else:
+                    ratings.add_review(conn, *args)
+            except availability.BookingConflict:
+                lost += 1
+            samples.append((time.perf_counter() - started) * 1000)
+        if conn is not None:
+            conn.close()
+        with lock:
+            latencies.extend(samples)
+            conflicts[0] += lost
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    start_gate.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+    result = {
+        "mode": mode,
+        "writes": len(latencies),
+        "conflicts": conflicts[0],
+        "seconds": round(seconds, 3),
+        "writes_per_second": round(len(latencies) / seconds, 1),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+    if queue is not None:
+        queue.close()
+        result["batches"] = queue.batches
+        result["mean_batch"] = round(queue.writes / float(queue.batches or 1), 1)
+    return result
+
+
+def connector(connect_db, path, synchronous):
+    """connect(): a plain connection to `path` with the app's pragmas and the given fsync level."""
+    def connect():
+        conn = connect_db(path, factory=sqlite3.Connection)
+        conn.execute("PRAGMA synchronous = %s" % synchronous)
+        return conn
+    return connect
@@ -0,0 +1,141 @@
+"""A user's bookings for the dashboard: keyset pages and precomputed summaries.
+
+Pages walk the bookings(user_id, created_at) index newest first, addressed by a
+cursor holding the (created_at, id) of the last row shown. The summary tiles
+read two small per-user tables that triggers on `bookings` keep up to date, so
+the dashboard never aggregates a user's whole booking history.
+"""
+from listings import decode_cursor, encode_cursor
+
+PAGE_SIZE = 25
+VIEWS = ("upcoming", "past")
+
+SUMMARY_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS user_booking_totals (
+        user_id INTEGER NOT NULL,
+        currency TEXT NOT NULL,
+        bookings INTEGER NOT NULL DEFAULT 0,
+        hours INTEGER NOT NULL DEFAULT 0,
+        spend REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, currency)
+    ) WITHOUT ROWID;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_workspace_usage (
+        user_id INTEGER NOT NULL,
+        workspace_id INTEGER NOT NULL,
+        bookings INTEGER NOT NULL DEFAULT 0,
+        hours INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, workspace_id)
+    ) WITHOUT ROWID;
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_user_workspace_usage_hours ON user_workspace_usage (user_id, hours DESC)",
+    # Spend is counted in the workspace's currency at the time of booking
+    """
+    CREATE TRIGGER IF NOT EXISTS bookings_summary_insert AFTER INSERT ON bookings
+    BEGIN
+        INSERT INTO user_booking_totals (user_id, currency, bookings, hours, spend)
+        SELECT NEW.user_id, IFNULL(currency, 'USD'), 1, NEW.hours, NEW.total_price
+        FROM workspaces WHERE id = NEW.workspace_id
+        ON CONFLICT (user_id, currency) DO UPDATE
+        SET bookings = bookings + 1, hours = hours + excluded.hours, spend = spend + excluded.spend;
+        INSERT INTO user_workspace_usage (user_id, workspace_id, bookings, hours)
+        VALUES (NEW.user_id, NEW.workspace_id, 1, NEW.hours)
+        ON CONFLICT (user_id, workspace_id) DO UPDATE
+        SET bookings = bookings + 1, hours = hours + excluded.hours;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS bookings_summary_delete AFTER DELETE ON bookings
+    BEGIN
+        UPDATE user_booking_totals
+        SET bookings = bookings - 1, hours = hours - OLD.hours, spend = spend - OLD.total_price
+        WHERE user_id = OLD.user_id
+          AND currency = (SELECT IFNULL(currency, 'USD') FROM workspaces WHERE id = OLD.workspace_id);
+        UPDATE user_workspace_usage
+        SET bookings = bookings - 1, hours = hours - OLD.hours
+        WHERE user_id = OLD.user_id AND workspace_id = OLD.workspace_id;
+    END;
+    """,
+)
+
+
+def bookings_page(conn, user_id, view, today, cursor=None, limit=PAGE_SIZE):
+    """Return (rows, next_cursor) for one page of upcoming or past bookings, newest booked first."""
+    # Bookings from before booking_date existed have none; they can only be in the past
+    where = [
+        "b.user_id = ?",
+        "b.booking_date >= ?" if view == "upcoming" else "(b.booking_date < ? OR b.booking_date IS NULL)",
+    ]
+    params = [user_id, today]
+    if cursor is not None:
+        values = decode_cursor(cursor, (str, int))
+        where.append("(b.created_at, b.id) < (?, ?)")
+        params.extend(values)
+    rows = conn.execute(
+        f"""
+        SELECT b.*, w.name AS workspace_name, w.price_per_hour, w.rating, w.currency
+        FROM bookings b
+        JOIN workspaces w ON b.workspace_id = w.id
+        WHERE {" AND ".join(where)}
+        ORDER BY b.created_at DESC, b.id DESC
+        LIMIT ?
+        """,
+        params + [limit + 1],
+    ).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1]["created_at"], rows[-1]["id"]])
+    return rows, next_cursor
+
+
+def user_summary(conn, user_id):
+    """Spend per currency, total bookings and hours, and the most-used workspace."""
+    totals = conn.execute(
+        "SELECT currency, bookings, hours, spend FROM user_booking_totals "
+        "WHERE user_id = ? AND bookings > 0 ORDER BY currency",
+        (user_id,),
+    ).fetchall()
+    favourite = conn.execute(
+        """
+        SELECT u.workspace_id, u.bookings, u.hours, w.name
+        FROM user_workspace_usage u
+        JOIN workspaces w ON w.id = u.workspace_id
+        WHERE u.user_id = ? AND u.hours > 0
+        ORDER BY u.hours DESC
+        LIMIT 1
+        """,
+        (user_id,),
+    ).fetchone()
+    return {
+        "spend": [(row["currency"], row["spend"]) for row in totals],
+        "bookings": sum(row["bookings"] for row in totals),
+        "hours": sum(row["hours"] for row in totals),
+        "favourite": dict(favourite) if favourite else None,
+    }
+
+
+def recompute_summaries(conn, commit=True):
+    """Rebuild both summary tables from the bookings table (used for existing databases)."""
+    conn.execute("DELETE FROM user_booking_totals")
+    conn.execute("DELETE FROM user_workspace_usage")
+    conn.execute(
+        """
+        INSERT INTO user_booking_totals (user_id, currency, bookings, hours, spend)
+        SELECT b.user_id, IFNULL(w.currency, 'USD'), COUNT(*), SUM(b.hours), SUM(b.total_price)
+        FROM bookings b JOIN workspaces w ON w.id = b.workspace_id
+        GROUP BY b.user_id, IFNULL(w.currency, 'USD')
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO user_workspace_usage (user_id, workspace_id, bookings, hours)
+        SELECT user_id, workspace_id, COUNT(*), SUM(hours)
+        FROM bookings
+        GROUP BY user_id, workspace_id
+        """
+    )
+    if commit:
+        conn.commit()
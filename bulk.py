@@ -0,0 +1,428 @@
+"""Streaming CSV/JSONL import and export for users, workspaces, bookings and reviews.
+
+Rows are read and written one at a time and grouped into batches of
+`BATCH_SIZE`, each inserted with executemany() in its own transaction, so
+memory use does not grow with the size of the file. Exports iterate the cursor
+with fetchmany() instead of loading the table.
+
+Imported rows go through the same checks as the web forms (new_workspace and
+workspace_detail). Bookings are checked against the occupancy index and rows
+that overlap an existing booking are rejected; the check is repeated under the
+write lock, so a booking made on the site meanwhile is not overlapped either.
+Rejected rows are reported and skipped unless `strict` is set.
+"""
+import csv
+import json
+import os
+import sqlite3
+from datetime import date, datetime
+
+from werkzeug.datastructures import FileStorage
+
+import availability
+import geo
+import images
+
+BATCH_SIZE = 5000
+
+EXPORT_COLUMNS = {
+    "users": ("id", "username", "email", "password_hash"),
+    "workspaces": (
+        "id", "name", "description", "price_per_hour", "rating", "image_path", "currency", "owner_id",
+        "latitude", "longitude",
+    ),
+    "bookings": ("id", "user_id", "workspace_id", "booking_date", "start_time", "hours", "total_price", "created_at"),
+    "reviews": ("id", "user_id", "workspace_id", "rating", "comment", "created_at"),
+}
+FORMATS = ("csv", "jsonl")
+
+
+class RowError(ValueError):
+    """A row failed validation; the message says which field and why."""
+
+
+def read_rows(stream, fmt):
+    """Yield (line_number, dict) from a CSV (with header) or JSONL text stream."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for number, line in enumerate(stream, 1):
+            if line.strip():
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield number, RowError("invalid JSON: %s" % e)
+                    continue
+                yield number, row if isinstance(row, dict) else RowError("expected a JSON object")
+
+
+def export_table(conn, table, stream, fmt, batch_size=BATCH_SIZE):
+    """Write every row of `table` to `stream`; returns the number of rows written."""
+    columns = EXPORT_COLUMNS[table]
+    cur = conn.execute("SELECT %s FROM %s ORDER BY id" % (", ".join(columns), table))
+    writer = csv.writer(stream) if fmt == "csv" else None
+    if writer:
+        writer.writerow(columns)
+    count = 0
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            return count
+        if writer:
+            writer.writerows(rows)
+        else:
+            stream.writelines(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows)
+        count += len(rows)
+
+
+def _text(row, key, required=False):
+    value = row.get(key)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise RowError("%s is required" % key)
+    return value or None
+
+
+def _number(row, key, cast=float, required=False):
+    value = _text(row, key, required)
+    if value is None:
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        raise RowError("%s must be a number" % key)
+
+
+def _date(row, key):
+    value = _text(row, key, required=True)
+    # date.fromisoformat is much faster than strptime, but also accepts YYYYMMDD
+    try:
+        if len(value) != 10:
+            raise ValueError
+        date.fromisoformat(value)
+    except ValueError:
+        raise RowError("%s must be YYYY-MM-DD" % key)
+    return value
+
+
+def _timestamp(row, key):
+    value = _text(row, key)
+    if value is None:
+        return datetime.utcnow().isoformat()
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        raise RowError("%s must be an ISO timestamp" % key)
+    return value
+
+
+class Importer:
+    """Validate and load rows into one table in batched transactions.
+
+    `upsert` (workspaces only) updates the existing workspace with the same name
+    instead of inserting a duplicate. `keep_ids` inserts each row's `id` column
+    as-is, which keeps references intact when moving a whole database.
+    """
+
+    def __init__(self, conn, table, upsert=False, keep_ids=False, image_dir=None,
+                 upload_folder=None, allowed_extensions=(), batch_size=BATCH_SIZE):
+        if table not in EXPORT_COLUMNS:
+            raise ValueError("unknown table %r" % table)
+        if upsert and table != "workspaces":
+            raise ValueError("upsert by name is only supported for workspaces")
+        self.conn = conn
+        self.table = table
+        self.upsert = upsert
+        self.keep_ids = keep_ids
+        self.image_dir = image_dir
+        self.upload_folder = upload_folder
+        self.allowed_extensions = allowed_extensions
+        self.batch_size = batch_size
+        self.inserted = 0
+        self.updated = 0
+        self.rejected = 0
+        self._exists = {}
+        self._masks = {}
+
+    def run(self, rows, on_error=None, strict=False):
+        """Import (line, row) pairs from read_rows(); returns {"inserted", "updated", "rejected"}."""
+        self._on_error = on_error
+        self._strict = strict
+        clean = getattr(self, "_clean_" + self.table)
+        batch = []
+        for line, row in rows:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                batch.append((line, clean(row)))
+            except RowError as e:
+                self._reject(line, e)
+                continue
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+        return {"inserted": self.inserted, "updated": self.updated, "rejected": self.rejected}
+
+    def _reject(self, line, error):
+        self.rejected += 1
+        if self._strict:
+            raise RowError("line %d: %s" % (line, error))
+        if self._on_error is not None:
+            self._on_error(line, error)
+
+    def _flush(self, batch):
+        write = getattr(self, "_write_" + self.table)
+        recheck = getattr(self, "_recheck_" + self.table, None)
+        counts = self.inserted, self.updated
+        rejected = []
+
+        def checked():
+            # Runs inside the write transaction: checks that depend on rows other
+            # writers may have committed since the batch was cleaned
+            del rejected[:]
+            if recheck is None:
+                return batch
+            self._masks.clear()
+            kept = []
+            for line, values in batch:
+                try:
+                    recheck(values)
+                except RowError as e:
+                    if self._strict:
+                        self._reject(line, e)
+                    rejected.append((line, e))
+                    continue
+                kept.append((line, values))
+            return kept
+
+        try:
+            self._transaction(lambda: write([values for _, values in checked()]))
+        except sqlite3.IntegrityError:
+            # A duplicate id/username somewhere in the batch: redo it row by row to find it
+            self.inserted, self.updated = counts
+            self._transaction(lambda: self._write_each(write, checked()))
+        finally:
+            # Occupancy seen while checking this batch may be stale once other writers commit
+            self._masks.clear()
+        for line, error in rejected:
+            self._reject(line, error)
+
+    def _transaction(self, body):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            body()
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+
+    def _write_each(self, write, batch):
+        for line, values in batch:
+            self.conn.execute("SAVEPOINT import_row")
+            try:
+                write([values])
+            except sqlite3.IntegrityError as e:
+                self.conn.execute("ROLLBACK TO import_row")
+                self._reject(line, RowError(str(e)))
+            self.conn.execute("RELEASE import_row")
+
+    def _id(self, row):
+        if not self.keep_ids:
+            return ()
+        return (_number(row, "id", int, required=True),)
+
+    def _references(self, table, row, key):
+        value = _number(row, key, int, required=True)
+        found = self._exists.get((table, value))
+        if found is None:
+            if len(self._exists) > 100000:
+                self._exists.clear()
+            found = self._exists[(table, value)] = self.conn.execute(
+                "SELECT %s FROM %s WHERE id = ?" % ("price_per_hour" if table == "workspaces" else "1", table),
+                (value,),
+            ).fetchone() or False
+        if not found:
+            raise RowError("%s %d does not exist" % (key, value))
+        return value, found[0]
+
+    # users
+
+    def _clean_users(self, row):
+        username = _text(row, "username", required=True)
+        email = _text(row, "email", required=True)
+        password_hash = _text(row, "password_hash", required=True)
+        if "@" not in email:
+            raise RowError("email is not valid")
+        return self._id(row) + (username, email, password_hash)
+
+    def _write_users(self, batch):
+        columns = ("id",) * self.keep_ids + ("username", "email", "password_hash")
+        self.conn.executemany(
+            "INSERT INTO users (%s) VALUES (%s)" % (", ".join(columns), ", ".join("?" * len(columns))), batch
+        )
+        self.inserted += len(batch)
+
+    # workspaces
+
+    def _clean_workspaces(self, row):
+        name = _text(row, "name", required=True)
+        price = _number(row, "price_per_hour") if "price_per_hour" in row else _number(row, "price")
+        if price is None:
+            raise RowError("price_per_hour is required")
+        rating = _number(row, "rating")
+        currency = (_text(row, "currency") or "USD").upper()
+        if len(currency) != 3 or not currency.isalpha():
+            raise RowError("currency must be a three-letter code")
+        owner_id = self._references("users", row, "owner_id")[0] if _text(row, "owner_id") else None
+        image_path = _text(row, "image_path")
+        if _text(row, "image"):
+            image_path = self._attach(_text(row, "image"))
+        lat, lon = _number(row, "latitude"), _number(row, "longitude")
+        if (lat is None) != (lon is None):
+            raise RowError("latitude and longitude must be given together")
+        if lat is not None:
+            try:
+                lat, lon = geo.check_point(lat, lon)
+            except ValueError as e:
+                raise RowError(str(e))
+        return self._id(row) + (
+            name, _text(row, "description") or "", price, rating, image_path, currency, owner_id, lat, lon
+        )
+
+    def _attach(self, filename):
+        """Store a local image the way uploads are stored and return its image_path."""
+        if not self.upload_folder:
+            raise RowError("image given but no upload folder configured")
+        path = filename if os.path.isabs(filename) else os.path.join(self.image_dir or ".", filename)
+        ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+        if ext not in self.allowed_extensions:
+            raise RowError("invalid image type: %s" % filename)
+        try:
+            with open(path, "rb") as f:
+                stored = images.save_upload(FileStorage(stream=f, filename=os.path.basename(path)), self.upload_folder)
+        except OSError as e:
+            raise RowError("cannot read image %s: %s" % (filename, e.strerror))
+        return "uploads/%s" % stored
+
+    def _write_workspaces(self, batch):
+        columns = ("id",) * self.keep_ids + (
+            "name", "description", "price_per_hour", "rating", "image_path", "currency", "owner_id",
+            "latitude", "longitude",
+        )
+        insert = "INSERT INTO workspaces (%s) VALUES (%s)" % (", ".join(columns), ", ".join("?" * len(columns)))
+        if not self.upsert:
+            self.conn.executemany(insert, batch)
+            self.inserted += len(batch)
+            return
+        for values in batch:
+            fields = values[self.keep_ids:]
+            existing = self.conn.execute(
+                "SELECT id FROM workspaces WHERE name = ? ORDER BY id LIMIT 1", (fields[0],)
+            ).fetchone()
+            if existing is None:
+                # Inserted right away, so a later row with the same name updates it
+                self.conn.execute(insert, values)
+                self.inserted += 1
+                continue
+            # An empty image or coordinate column keeps the current value
+            self.conn.execute(
+                """
+                UPDATE workspaces
+                SET description = ?, price_per_hour = ?, rating = COALESCE(?, rating),
+                    image_path = COALESCE(?, image_path), currency = ?, owner_id = COALESCE(?, owner_id),
+                    latitude = COALESCE(?, latitude), longitude = COALESCE(?, longitude)
+                WHERE id = ?
+                """,
+                fields[1:] + (existing[0],),
+            )
+            self.updated += 1
+
+    # bookings
+
+    def _clean_bookings(self, row):
+        user_id = self._references("users", row, "user_id")[0]
+        workspace_id, price = self._references("workspaces", row, "workspace_id")
+        booking_date = _date(row, "booking_date")
+        start_time = _text(row, "start_time", required=True)
+        hour, _, minute = start_time.partition(":")
+        if not (hour.isdigit() and minute.isdigit() and len(minute) == 2 and int(hour) < 24 and int(minute) < 60):
+            raise RowError("start_time must be HH:MM")
+        if minute != "00":
+            raise RowError("start_time must be on the hour")
+        start_hour = int(hour)
+        hours = _number(row, "hours", int, required=True)
+        if hours <= 0:
+            raise RowError("hours must be positive")
+        if hours > availability.MAX_BOOKING_HOURS:
+            raise RowError("hours must be at most %d" % availability.MAX_BOOKING_HOURS)
+        total_price = _number(row, "total_price")
+        if total_price is None:
+            total_price = hours * price
+        try:
+            spans = availability.split_booking(booking_date, start_hour, hours)
+        except ValueError as e:
+            raise RowError(str(e))
+        self._claim(workspace_id, spans)
+        return self._id(row) + (
+            user_id, workspace_id, booking_date, "%02d:00" % start_hour, hours, total_price,
+            _timestamp(row, "created_at"),
+        ), spans
+
+    def _occupied(self, workspace_id, day):
+        key = (workspace_id, day)
+        if key not in self._masks:
+            found = self.conn.execute(
+                "SELECT hours_mask FROM workspace_occupancy WHERE workspace_id = ? AND day = ?", key
+            ).fetchone()
+            self._masks[key] = found[0] if found else 0
+        return self._masks[key]
+
+    def _claim(self, workspace_id, spans):
+        """Reserve the booking's hours in self._masks, or raise RowError if any are taken."""
+        for day, mask in spans:
+            if self._occupied(workspace_id, day) & mask:
+                raise RowError("overlaps an existing booking of workspace %d on %s" % (workspace_id, day))
+        for day, mask in spans:
+            self._masks[(workspace_id, day)] |= mask
+
+    def _recheck_bookings(self, values_spans):
+        values, spans = values_spans
+        self._claim(values[self.keep_ids + 1], spans)
+
+    def _write_bookings(self, batch):
+        columns = ("id",) * self.keep_ids + (
+            "user_id", "workspace_id", "booking_date", "start_time", "hours", "total_price", "created_at"
+        )
+        self.conn.executemany(
+            "INSERT INTO bookings (%s) VALUES (%s)" % (", ".join(columns), ", ".join("?" * len(columns))),
+            [values for values, _ in batch],
+        )
+        self.conn.executemany(
+            """
+            INSERT INTO workspace_occupancy (workspace_id, day, hours_mask) VALUES (?, ?, ?)
+            ON CONFLICT (workspace_id, day) DO UPDATE SET hours_mask = hours_mask | excluded.hours_mask
+            """,
+            [(values[self.keep_ids + 1], day, mask) for values, spans in batch for day, mask in spans],
+        )
+        self.inserted += len(batch)
+
+    # reviews
+
+    def _clean_reviews(self, row):
+        user_id = self._references("users", row, "user_id")[0]
+        workspace_id = self._references("workspaces", row, "workspace_id")[0]
+        rating = _number(row, "rating", int, required=True)
+        if rating < 1 or rating > 5:
+            raise RowError("rating must be between 1 and 5")
+        return self._id(row) + (user_id, workspace_id, rating, _text(row, "comment"), _timestamp(row, "created_at"))
+
+    def _write_reviews(self, batch):
+        columns = ("id",) * self.keep_ids + ("user_id", "workspace_id", "rating", "comment", "created_at")
+        self.conn.executemany(
+            "INSERT INTO reviews (%s) VALUES (%s)" % (", ".join(columns), ", ".join("?" * len(columns))), batch
+        )
+        self.inserted += len(batch)
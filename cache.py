@@ -0,0 +1,208 @@
+"""Query-result cache for read-heavy pages, invalidated by the writes that change them.
+
+Entries live in a namespace such as "explore" or "workspace:5". Every namespace
+has a generation number that is part of each key, so invalidating a namespace is
+a single counter bump: older entries can never be read again and simply age out.
+
+Two backends are available:
+
+* MemoryBackend - per-process LRU with TTL (the default). Invalidation is only
+  seen by the process that performed the write, so with several worker processes
+  other workers may serve stale data for up to `ttl` seconds.
+* FileBackend - pickled entries in a local directory shared by every worker on the
+  host (point it at /dev/shm to keep it in shared memory). Generations are files
+  too, so invalidation is seen by all workers. Every so often a write sweeps the
+  directory: expired entries are deleted (including those of older generations,
+  which expire like any other), then the oldest until `maxsize` remain.
+"""
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    def __init__(self, maxsize=512, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def generation(self, namespace):
+        return self._generations.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FileBackend:
+    def __init__(self, directory, ttl=60.0, maxsize=512):
+        self.directory = directory
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # Between sweeps each worker can add this many entries beyond maxsize
+        self.sweep_every = max(1, maxsize // 8)
+        self._sets = 0
+        self._sweep_lock = threading.Lock()
+        os.makedirs(os.path.join(directory, "gen"), exist_ok=True)
+
+    def _path(self, *parts):
+        name = hashlib.sha1(parts[-1].encode()).hexdigest()
+        return os.path.join(self.directory, *parts[:-1], name)
+
+    def _write(self, path, data):
+        tmp = "%s.%d-%d.tmp" % (path, os.getpid(), threading.get_ident())
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                expires, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return False, None
+        if expires < time.time():
+            return False, None
+        return True, value
+
+    def set(self, key, value):
+        self._write(self._path(key), pickle.dumps((time.time() + self.ttl, value), pickle.HIGHEST_PROTOCOL))
+        self._sets += 1
+        if self._sets >= self.sweep_every and self._sweep_lock.acquire(blocking=False):
+            try:
+                self._sets = 0
+                self.sweep()
+            finally:
+                self._sweep_lock.release()
+
+    def sweep(self):
+        """Delete expired entries, then the oldest ones beyond maxsize; returns how many were removed."""
+        now = time.time()
+        entries = []
+        removed = 0
+        for entry in os.scandir(self.directory):
+            try:
+                if not entry.is_file():
+                    continue
+                mtime = entry.stat().st_mtime
+                # An entry expires ttl seconds after it was written; stale .tmp files are left by crashes
+                if mtime + self.ttl < now:
+                    os.remove(entry.path)
+                    removed += 1
+                elif not entry.name.endswith(".tmp"):
+                    entries.append((mtime, entry.path))
+            except FileNotFoundError:
+                # Another worker swept it first
+                continue
+        if len(entries) > self.maxsize:
+            entries.sort()
+            for _, path in entries[:len(entries) - self.maxsize]:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def generation(self, namespace):
+        try:
+            with open(self._path("gen", namespace), "rb") as f:
+                return int(f.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def bump(self, namespace):
+        # A lost update between two concurrent bumps is harmless: either way the
+        # generation moves past every entry written before the invalidating write.
+        self._write(self._path("gen", namespace), str(self.generation(namespace) + 1).encode())
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def __len__(self):
+        return sum(
+            1 for name in os.listdir(self.directory)
+            if not name.endswith(".tmp") and os.path.isfile(os.path.join(self.directory, name))
+        )
+
+
+class Cache:
+    """Front end used by the views: get_or_load() plus namespace invalidation and counters."""
+
+    def __init__(self, backend, enabled=True):
+        self.backend = backend
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_or_load(self, namespace, key, loader):
+        """Return the cached value for (namespace, key), calling loader() on a miss."""
+        if not self.enabled:
+            return loader()
+        full_key = "%s@%d|%s" % (namespace, self.backend.generation(namespace), key)
+        found, value = self.backend.get(full_key)
+        if found:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = loader()
+        self.backend.set(full_key, value)
+        return value
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self.backend.bump(namespace)
+            self.invalidations += 1
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+def rows_to_dicts(rows):
+    """sqlite3.Row objects can't be pickled; templates read dicts the same way."""
+    return [dict(row) for row in rows]
@@ -0,0 +1,183 @@
+"""Nearby-workspace search backed by an SQLite R*Tree over workspace coordinates.
+
+`workspaces_geo` holds one point-sized box per workspace that has coordinates,
+and triggers on `workspaces` keep it in sync. A lookup turns the search circle
+into its bounding box (two boxes across the antimeridian), lets the R*Tree
+return only the workspaces inside it, then ranks those by exact great-circle
+distance and drops the box corners that fall outside the radius. A page only
+needs the nearest few, so the search starts with a small circle and widens it
+until the page is full. Dense city centres never read the whole radius.
+
+The R*Tree stores 32-bit floats rounded outwards, so it can only over-select.
+Distances are always computed from the exact columns on `workspaces`.
+"""
+import heapq
+import math
+
+from listings import LISTING_COLUMNS, PAGE_SIZE, decode_cursor, encode_cursor
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+DEFAULT_RADIUS_KM = 10.0
+MAX_RADIUS_KM = 500.0
+# First search radius; it doubles until a page is full or radius_km is reached
+INITIAL_REACH_KM = 1.0
+
+GEO_SCHEMA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS workspaces_geo USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    """
+    CREATE TRIGGER IF NOT EXISTS workspaces_geo_insert AFTER INSERT ON workspaces
+    WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL
+    BEGIN
+        INSERT INTO workspaces_geo VALUES (NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS workspaces_geo_update AFTER UPDATE OF latitude, longitude ON workspaces
+    BEGIN
+        DELETE FROM workspaces_geo WHERE id = OLD.id;
+        INSERT INTO workspaces_geo
+        SELECT NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude
+        WHERE NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS workspaces_geo_delete AFTER DELETE ON workspaces
+    BEGIN
+        DELETE FROM workspaces_geo WHERE id = OLD.id;
+    END;
+    """,
+)
+
+
+def check_point(lat, lon):
+    """Validate a coordinate pair; returns (lat, lon) as floats or raises ValueError."""
+    lat, lon = float(lat), float(lon)
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        raise ValueError("latitude must be within ±90 and longitude within ±180")
+    return lat, lon
+
+
+def parse_point(text):
+    """Parse "lat,lon" as given in ?near=; raises ValueError."""
+    parts = (text or "").split(",")
+    if len(parts) != 2:
+        raise ValueError("expected lat,lon")
+    return check_point(parts[0], parts[1])
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_boxes(lat, lon, radius_km):
+    """[(min_lat, max_lat, min_lon, max_lon), ...] covering the circle; split at the antimeridian."""
+    dlat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        # The circle contains a pole: every longitude is in range
+        return [(max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0)]
+    # Widest longitude span of the circle, at the latitude where it touches its meridians
+    ratio = math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat))
+    dlon = 180.0 if ratio >= 1.0 else math.degrees(math.asin(ratio))
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if max_lon - min_lon >= 360.0:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+    if min_lon < -180.0:
+        return [(min_lat, max_lat, min_lon + 360.0, 180.0), (min_lat, max_lat, -180.0, max_lon)]
+    if max_lon > 180.0:
+        return [(min_lat, max_lat, min_lon, 180.0), (min_lat, max_lat, -180.0, max_lon - 360.0)]
+    return [(min_lat, max_lat, min_lon, max_lon)]
+
+
+def _candidates(conn, lat, lon, radius_km, where, params, after):
+    """[(distance, id), ...] for the filtered workspaces within radius_km that sort after `after`."""
+    selects, args = [], []
+    for box in bounding_boxes(lat, lon, radius_km):
+        # CROSS JOIN keeps the R*Tree as the outer loop even when a filter has an index of its own
+        selects.append(
+            "SELECT w.id, w.latitude, w.longitude FROM workspaces_geo g CROSS JOIN workspaces w ON w.id = g.id "
+            "WHERE g.max_lat >= ? AND g.min_lat <= ? AND g.max_lon >= ? AND g.min_lon <= ?"
+            + "".join(" AND " + clause for clause in where)
+        )
+        args.extend(box)
+        args.extend(params)
+    candidates = []
+    for workspace_id, w_lat, w_lon in conn.execute(" UNION ALL ".join(selects), args):
+        distance = haversine_km(lat, lon, w_lat, w_lon)
+        if distance <= radius_km and (after is None or (distance, workspace_id) > after):
+            candidates.append((distance, workspace_id))
+    return candidates
+
+
+def nearby_page(conn, lat, lon, radius_km=DEFAULT_RADIUS_KM, cursor=None, currency=None, min_price=None,
+                max_price=None, min_rating=None, limit=PAGE_SIZE):
+    """Return (rows, next_cursor) for one page of workspaces within `radius_km`, nearest first.
+
+    Rows are dicts with the listing columns plus `distance_km`. The cursor holds
+    the (distance, id) of the last row shown.
+    """
+    if not math.isfinite(radius_km):
+        raise ValueError("radius_km must be finite")
+    where, params = [], []
+    if currency:
+        where.append("w.currency = ?")
+        params.append(currency)
+    if min_price is not None:
+        where.append("w.price_per_hour >= ?")
+        params.append(min_price)
+    if max_price is not None:
+        where.append("w.price_per_hour <= ?")
+        params.append(max_price)
+    if min_rating is not None:
+        where.append("IFNULL(w.rating, 0) >= ?")
+        params.append(min_rating)
+    after = None
+    if cursor is not None:
+        distance, workspace_id = decode_cursor(cursor, (float, int))
+        after = (float(distance), workspace_id)
+        if after[0] < 0:
+            raise ValueError("invalid cursor")
+
+    # Search a small circle first and double it until it holds more than a page:
+    # everything nearer than its edge has then been seen, so the page is final
+    reach = min(radius_km, max(INITIAL_REACH_KM, (after[0] if after else 0.0) + INITIAL_REACH_KM))
+    while True:
+        candidates = _candidates(conn, lat, lon, reach, where, params, after)
+        if len(candidates) > limit or reach >= radius_km:
+            break
+        reach = min(radius_km, reach * 2)
+    page = heapq.nsmallest(limit + 1, candidates)
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor(list(page[-1]))
+    if not page:
+        return [], None
+    by_id = {
+        row["id"]: row
+        for row in conn.execute(
+            "SELECT %s, latitude, longitude FROM workspaces WHERE id IN (%s)"
+            % (LISTING_COLUMNS, ", ".join("?" * len(page))),
+            [workspace_id for _, workspace_id in page],
+        )
+    }
+    rows = [dict(by_id[workspace_id], distance_km=round(distance, 2)) for distance, workspace_id in page]
+    return rows, next_cursor
+
+
+def set_coordinates(conn, points, commit=True):
+    """Set (workspace_id, lat, lon) for existing workspaces; None clears them. Returns rows updated."""
+    updated = 0
+    for workspace_id, lat, lon in points:
+        if lat is not None or lon is not None:
+            lat, lon = check_point(lat, lon)
+        updated += conn.execute(
+            "UPDATE workspaces SET latitude = ?, longitude = ? WHERE id = ?", (lat, lon, workspace_id)
+        ).rowcount
+    if commit:
+        conn.commit()
+    return updated
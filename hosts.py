@@ -0,0 +1,237 @@
+"""Occupancy and revenue rollups for workspace owners.
+
+`workspace_stats` holds one row per workspace per day, ISO week (starting
+Monday) and calendar month, with bookings, booked hours and revenue. Triggers on
+`bookings` update all three grains as bookings are written, so host analytics
+read a few rows per listing instead of scanning bookings.
+
+A booking counts once, with its full revenue, in the period of its booking_date.
+Its hours are spread over the days they fall on, the same way split_booking()
+spreads them, and only hours within the bookable day (OPEN_HOUR up to the end of
+the LAST_START_HOUR slot) count, so occupancy is measured against what could
+have been booked. Revenue is in the workspace's currency.
+"""
+import calendar
+from datetime import date, timedelta
+
+from availability import LAST_START_HOUR, MAX_BOOKING_HOURS, OPEN_HOUR
+
+# Hours offered per day by the booking form; the denominator of occupancy
+BOOKABLE_HOURS = LAST_START_HOUR + 1 - OPEN_HOUR
+
+GRAINS = ("day", "week", "month")
+# How many periods each grain shows, counting back from the current one
+WINDOWS = {"day": 30, "week": 12, "month": 12}
+
+# Period containing the date expression {day}
+_PERIOD_START = {
+    "day": "{day}",
+    "week": "date({day}, 'weekday 0', '-6 days')",
+    "month": "strftime('%Y-%m-01', {day})",
+}
+# Day offsets a booking can reach: the longest booking started in the last hour of the day
+_DAY_OFFSETS = "(VALUES %s)" % ", ".join("(%d)" % k for k in range((23 + MAX_BOOKING_HOURS - 1) // 24 + 1))
+
+
+def _booking_days(row, source=""):
+    """SELECT of one row per day of a booking: its bookable hours that day, and its revenue on the first.
+
+    `row` names the booking (NEW, OLD, or an alias joined in through `source`).
+    Triggers can't use a recursive CTE, so the days come from a fixed list of offsets.
+    """
+    # Hours counted from midnight of booking_date; bookings without a start time count from opening
+    start = f"IFNULL(CAST(substr({row}.start_time, 1, 2) AS INTEGER), {OPEN_HOUR})"
+    end = f"{start} + {row}.hours"
+    k = "offsets.column1"
+    return f"""
+        SELECT {row}.workspace_id AS workspace_id, {k} AS k,
+               date({row}.booking_date, '+' || {k} || ' days') AS day,
+               MAX(0, MIN({end}, 24 * {k} + {LAST_START_HOUR + 1}) - MAX({start}, 24 * {k} + {OPEN_HOUR})) AS hours,
+               CASE WHEN {k} = 0 THEN IFNULL({row}.total_price, 0) ELSE 0 END AS revenue
+        FROM {source}{_DAY_OFFSETS} AS offsets
+        WHERE {k} * 24 < {end}"""
+
+
+def _stats_rows(grain, days, sign=1):
+    """SELECT of workspace_stats rows for `grain` from a _booking_days() subquery."""
+    return f"""
+        SELECT workspace_id, '{grain}', {_PERIOD_START[grain].format(day="day")},
+               {sign} * SUM(k = 0), {sign} * SUM(hours), {sign} * SUM(revenue)
+        FROM ({days})
+        WHERE day IS NOT NULL
+        GROUP BY workspace_id, 3"""
+
+
+def _upserts(row, sign):
+    return "\n".join(
+        f"""
+        INSERT INTO workspace_stats (workspace_id, grain, period_start, bookings, hours, revenue)
+        {_stats_rows(grain, _booking_days(row), sign)}
+        ON CONFLICT (workspace_id, grain, period_start) DO UPDATE
+        SET bookings = bookings + excluded.bookings, hours = hours + excluded.hours,
+            revenue = revenue + excluded.revenue;
+        """
+        for grain in GRAINS
+    )
+
+
+STATS_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS workspace_stats (
+        workspace_id INTEGER NOT NULL,
+        grain TEXT NOT NULL,
+        period_start TEXT NOT NULL,
+        bookings INTEGER NOT NULL DEFAULT 0,
+        hours INTEGER NOT NULL DEFAULT 0,
+        revenue REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (workspace_id, grain, period_start)
+    ) WITHOUT ROWID;
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_workspaces_owner ON workspaces (owner_id)",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS bookings_stats_insert AFTER INSERT ON bookings
+    WHEN NEW.booking_date IS NOT NULL
+    BEGIN
+        {_upserts("NEW", 1)}
+    END;
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS bookings_stats_delete AFTER DELETE ON bookings
+    WHEN OLD.booking_date IS NOT NULL
+    BEGIN
+        {_upserts("OLD", -1)}
+    END;
+    """,
+)
+
+
+def period_start(day, grain):
+    if grain == "week":
+        return day - timedelta(days=day.weekday())
+    if grain == "month":
+        return day.replace(day=1)
+    return day
+
+
+def period_days(start, grain):
+    if grain == "week":
+        return 7
+    if grain == "month":
+        return calendar.monthrange(start.year, start.month)[1]
+    return 1
+
+
+def window_start(today, grain):
+    """First period shown for `grain`: WINDOWS[grain] periods ending with the current one."""
+    start = period_start(today, grain)
+    for _ in range(WINDOWS[grain] - 1):
+        start = period_start(start - timedelta(days=1), grain)
+    return start
+
+
+def occupancy(hours, start, grain):
+    # Bookings can't overlap, but rows imported before that was enforced may; never report over 100%
+    return min(1.0, hours / float(period_days(start, grain) * BOOKABLE_HOURS))
+
+
+def host_stats(conn, owner_id, grain, today, series=False):
+    """Per-workspace totals and per-period totals for one owner over the grain's window.
+
+    The window ends with the current period. Bookings already made for later
+    periods are left out, since occupancy is measured against the hours up to the
+    end of the current period. With `series`, each workspace also gets its own list
+    of periods (the JSON endpoint's detail).
+    """
+    since = window_start(today, grain).isoformat()
+    current = period_start(today, grain)
+    until = (current + timedelta(days=period_days(current, grain))).isoformat()
+    params = (grain, since, until, owner_id)
+    totals = conn.execute(
+        """
+        SELECT w.id, w.name, IFNULL(w.currency, 'USD') AS currency,
+               IFNULL(SUM(s.bookings), 0) AS bookings, IFNULL(SUM(s.hours), 0) AS hours,
+               IFNULL(SUM(s.revenue), 0) AS revenue
+        FROM workspaces w
+        LEFT JOIN workspace_stats s
+            ON s.workspace_id = w.id AND s.grain = ? AND s.period_start >= ? AND s.period_start < ?
+        WHERE w.owner_id = ?
+        GROUP BY w.id
+        ORDER BY w.id
+        """,
+        params,
+    ).fetchall()
+    by_period = conn.execute(
+        """
+        SELECT s.period_start, IFNULL(w.currency, 'USD') AS currency,
+               SUM(s.bookings) AS bookings, SUM(s.hours) AS hours, SUM(s.revenue) AS revenue
+        FROM workspaces w
+        JOIN workspace_stats s
+            ON s.workspace_id = w.id AND s.grain = ? AND s.period_start >= ? AND s.period_start < ?
+        WHERE w.owner_id = ?
+        GROUP BY s.period_start, 2
+        ORDER BY s.period_start
+        """,
+        params,
+    ).fetchall()
+
+    # Occupancy over the window counts every period up to the current one, booked or not
+    window_hours = (date.fromisoformat(until) - date.fromisoformat(since)).days * BOOKABLE_HOURS
+    workspaces = [
+        {
+            "id": row["id"], "name": row["name"], "currency": row["currency"],
+            "bookings": row["bookings"], "hours": row["hours"], "revenue": round(row["revenue"], 2),
+            "occupancy": round(min(1.0, row["hours"] / float(window_hours)), 4),
+        }
+        for row in totals
+    ]
+    periods = []
+    for row in by_period:
+        if not periods or periods[-1]["start"] != row["period_start"]:
+            periods.append({"start": row["period_start"], "bookings": 0, "hours": 0, "revenue": {}})
+        period = periods[-1]
+        period["bookings"] += row["bookings"]
+        period["hours"] += row["hours"]
+        period["revenue"][row["currency"]] = round(row["revenue"], 2)
+    listing_count = len(workspaces) or 1
+    for period in periods:
+        period["occupancy"] = round(
+            occupancy(period["hours"], date.fromisoformat(period["start"]), grain) / listing_count, 4
+        )
+
+    if series:
+        by_id = {ws["id"]: ws for ws in workspaces}
+        for ws in workspaces:
+            ws["periods"] = []
+        rows = conn.execute(
+            """
+            SELECT s.workspace_id, s.period_start, s.bookings, s.hours, s.revenue
+            FROM workspaces w
+            JOIN workspace_stats s
+                ON s.workspace_id = w.id AND s.grain = ? AND s.period_start >= ? AND s.period_start < ?
+            WHERE w.owner_id = ?
+            ORDER BY s.workspace_id, s.period_start
+            """,
+            params,
+        )
+        for workspace_id, start, bookings, hours, revenue in rows:
+            by_id[workspace_id]["periods"].append({
+                "start": start, "bookings": bookings, "hours": hours, "revenue": round(revenue, 2),
+                "occupancy": round(occupancy(hours, date.fromisoformat(start), grain), 4),
+            })
+    return {"grain": grain, "since": since, "until": until, "workspaces": workspaces, "periods": periods}
+
+
+def recompute_stats(conn, commit=True):
+    """Rebuild every rollup from the bookings table; returns the number of rows written."""
+    conn.execute("DELETE FROM workspace_stats")
+    written = 0
+    for grain in GRAINS:
+        days = _booking_days("b", source="bookings AS b, ") + " AND b.booking_date IS NOT NULL"
+        cur = conn.execute(
+            "INSERT INTO workspace_stats (workspace_id, grain, period_start, bookings, hours, revenue)"
+            + _stats_rows(grain, days)
+        )
+        written += cur.rowcount
+    if commit:
+        conn.commit()
+    return written
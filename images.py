@@ -0,0 +1,145 @@
+"""Upload storage and resized image derivatives.
+
+Uploads are stored under a name derived from their SHA-256, so identical files
+share one copy and different files can never overwrite each other. For every
+raster upload a background pool writes card- and detail-sized JPEG + WebP
+derivatives to `uploads/derived/`; templates use image_variants() to pick the
+smallest one that exists and fall back to the original while it is being built.
+
+Pillow is optional: without it uploads are still stored, just not resized.
+"""
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - derivatives are skipped without Pillow
+    Image = None
+
+log = logging.getLogger(__name__)
+
+DERIVED_DIR = "derived"
+# size name -> bounding box the image must cover (2x the CSS box for high-DPI screens)
+DERIVATIVE_SIZES = {
+    "card": (640, 440),
+    "detail": (1600, 440),
+}
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+# Vector images are already small and scale freely
+SKIP_EXTENSIONS = {"svg"}
+
+_executor = None
+_executor_lock = threading.Lock()
+_ready = set()
+
+
+def save_upload(file_storage, upload_folder, chunk_size=64 * 1024):
+    """Stream an uploaded file to disk under its content hash and return the stored filename."""
+    ext = file_storage.filename.rsplit(".", 1)[1].lower()
+    digest = hashlib.sha256()
+    tmp_path = os.path.join(upload_folder, ".upload-%d-%d.tmp" % (os.getpid(), threading.get_ident()))
+    with open(tmp_path, "wb") as out:
+        while True:
+            chunk = file_storage.stream.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+    filename = "%s.%s" % (digest.hexdigest()[:32], ext)
+    final_path = os.path.join(upload_folder, filename)
+    if os.path.exists(final_path):
+        # Same bytes were uploaded before: keep the existing copy
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, final_path)
+    return filename
+
+
+def derivative_paths(image_path, size):
+    """Return (jpeg, webp) static-relative paths of a derivative of `uploads/<name>`."""
+    folder, name = os.path.split(image_path)
+    stem = name.rsplit(".", 1)[0]
+    base = "/".join(p for p in (folder, DERIVED_DIR, "%s-%s" % (stem, size)) if p)
+    return base + ".jpg", base + ".webp"
+
+
+def generate_derivatives(static_folder, image_path, force=False):
+    """Write every derivative of one image; returns the number of files written."""
+    if Image is None or image_path.rsplit(".", 1)[-1].lower() in SKIP_EXTENSIONS:
+        return 0
+    src = os.path.join(static_folder, image_path)
+    written = 0
+    try:
+        with Image.open(src) as im:
+            im = ImageOps.exif_transpose(im)
+            if im.mode not in ("RGB", "RGBA"):
+                im = im.convert("RGBA" if "transparency" in im.info or im.mode in ("LA", "PA") else "RGB")
+            for size, box in DERIVATIVE_SIZES.items():
+                jpg_rel, webp_rel = derivative_paths(image_path, size)
+                jpg_path = os.path.join(static_folder, jpg_rel)
+                webp_path = os.path.join(static_folder, webp_rel)
+                if not force and os.path.exists(jpg_path) and os.path.exists(webp_path):
+                    continue
+                os.makedirs(os.path.dirname(jpg_path), exist_ok=True)
+                resized = _cover(im, box)
+                # Write to a private temp name and rename, so readers never see a partial file
+                tmp = ".%d-%d.tmp" % (os.getpid(), threading.get_ident())
+                resized.save(webp_path + tmp, "WEBP", quality=WEBP_QUALITY, method=4)
+                os.replace(webp_path + tmp, webp_path)
+                if resized.mode == "RGBA":
+                    flat = Image.new("RGB", resized.size, (255, 255, 255))
+                    flat.paste(resized, mask=resized.getchannel("A"))
+                    resized = flat
+                resized.save(jpg_path + tmp, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+                os.replace(jpg_path + tmp, jpg_path)
+                written += 2
+    except Exception:
+        log.exception("Could not build derivatives for %s", image_path)
+    return written
+
+
+def _cover(im, box):
+    """Downscale so the image still covers `box` (as CSS background-size: cover would); never upscale."""
+    scale = max(box[0] / im.width, box[1] / im.height)
+    if scale >= 1:
+        return im.copy()
+    size = (max(1, round(im.width * scale)), max(1, round(im.height * scale)))
+    return im.resize(size, Image.LANCZOS)
+
+
+def schedule_derivatives(static_folder, image_path):
+    """Build derivatives in the background so the upload request doesn't wait for them."""
+    global _executor
+    if Image is None:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="derivatives")
+    return _executor.submit(generate_derivatives, static_folder, image_path)
+
+
+def reset_executor():
+    """Forget the derivative pool (its threads don't survive a fork); the next upload starts a new one."""
+    global _executor
+    with _executor_lock:
+        _executor = None
+
+
+def image_variants(static_folder, image_path, size):
+    """Static-relative paths to render `image_path` at `size`.
+
+    Returns {"fallback": path, "webp": path-or-None}; `fallback` is the original
+    image until its derivatives exist on disk.
+    """
+    jpg_rel, webp_rel = derivative_paths(image_path, size)
+    if jpg_rel not in _ready:
+        if not (os.path.exists(os.path.join(static_folder, jpg_rel))
+                and os.path.exists(os.path.join(static_folder, webp_rel))):
+            return {"fallback": image_path, "webp": None}
+        # Derivatives are immutable once written, so only positive lookups are remembered
+        _ready.add(jpg_rel)
+    return {"fallback": jpg_rel, "webp": webp_rel}
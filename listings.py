@@ -0,0 +1,155 @@
+"""Keyset-paginated, filterable workspace listing for /explore.
+
+Pages are addressed by an opaque cursor holding the sort key and id of the last
+row shown, so fetching page N costs the same as page 1. Every sort has a
+composite index, with and without a leading `currency` column, so the common
+filter/sort combinations walk an index in order and stop after one page.
+"""
+import base64
+import json
+import math
+
+PAGE_SIZE = 24
+
+# NULL ratings (no owner rating, no reviews) sort as 0 so keyset comparisons stay total
+RATING_KEY = "IFNULL(rating, 0)"
+
+# sort name -> (key expression, direction)
+SORTS = {
+    "rating": (RATING_KEY, "DESC"),
+    "price": ("price_per_hour", "ASC"),
+    "newest": (None, "DESC"),  # id order; AUTOINCREMENT ids grow with insertion time
+}
+DEFAULT_SORT = "rating"
+
+EXPLORE_INDEXES = (
+    f"CREATE INDEX IF NOT EXISTS ix_workspaces_rating ON workspaces ({RATING_KEY} DESC, id DESC)",
+    f"CREATE INDEX IF NOT EXISTS ix_workspaces_currency_rating ON workspaces (currency, {RATING_KEY} DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_workspaces_price ON workspaces (price_per_hour, id)",
+    "CREATE INDEX IF NOT EXISTS ix_workspaces_currency_price ON workspaces (currency, price_per_hour, id)",
+    "CREATE INDEX IF NOT EXISTS ix_workspaces_currency_id ON workspaces (currency, id)",
+)
+
+LISTING_COLUMNS = "id, name, description, price_per_hour, rating, review_count, image_path, currency, version"
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+# Largest integer SQLite can bind; a bigger one raises OverflowError in execute()
+MAX_SQL_INT = 2 ** 63 - 1
+
+
+def _cursor_value(value, kind):
+    """Check one decoded value: `int` is an SQLite integer, `float` any finite number, `str` text."""
+    if isinstance(value, bool):
+        return False
+    if kind is str:
+        return isinstance(value, str)
+    if isinstance(value, int):
+        return -MAX_SQL_INT <= value <= MAX_SQL_INT
+    return kind is float and isinstance(value, float) and math.isfinite(value)
+
+
+def decode_cursor(cursor, shape):
+    """Decode a cursor from the query string; raises ValueError if it was tampered with.
+
+    `shape` gives the expected kind of each value in order, e.g. (float, int) for
+    a (price, id) cursor; see _cursor_value().
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("invalid cursor")
+    if (not isinstance(values, list) or len(values) != len(shape)
+            or not all(_cursor_value(v, kind) for v, kind in zip(values, shape))):
+        raise ValueError("invalid cursor")
+    return values
+
+
+def float_arg(value):
+    """A number from the query string, or None if it is missing, malformed or not finite."""
+    value = (value or "").strip()
+    try:
+        number = float(value) if value else None
+    except ValueError:
+        return None
+    return number if number is not None and math.isfinite(number) else None
+
+
+def parse_filters(args):
+    """The explore_page() filters given in a query string (request.args)."""
+    return {
+        "currency": args.get("currency") or None,
+        "min_price": float_arg(args.get("min_price")),
+        "max_price": float_arg(args.get("max_price")),
+        "min_rating": float_arg(args.get("min_rating")),
+    }
+
+
+def explore_page(conn, sort=DEFAULT_SORT, cursor=None, currency=None, min_price=None,
+                 max_price=None, min_rating=None, limit=PAGE_SIZE):
+    """Return (rows, next_cursor) for one page of workspaces; next_cursor is None on the last page."""
+    key, direction = SORTS[sort]
+    where, params = [], []
+    if currency:
+        where.append("currency = ?")
+        params.append(currency)
+    if min_price is not None:
+        where.append("price_per_hour >= ?")
+        params.append(min_price)
+    if max_price is not None:
+        where.append("price_per_hour <= ?")
+        params.append(max_price)
+    if min_rating is not None:
+        where.append(f"{RATING_KEY} >= ?")
+        params.append(min_rating)
+
+    op = "<" if direction == "DESC" else ">"
+    order = f"id {direction}" if key is None else f"{key} {direction}, id {direction}"
+    values = None
+    if cursor is not None:
+        values = decode_cursor(cursor, (int,) if key is None else (float, int))
+        if key is None:
+            where.append(f"id {op} ?")
+            params.append(values[0])
+
+    if values is not None and key is not None:
+        # SQLite can't seek an expression index with a row value, (key, id) < (?, ?),
+        # and `key <= ? AND (key < ? OR id < ?)` still walks every row that shares the
+        # cursor's key. Instead run two seeks, the rest of the cursor's key band (in id
+        # order, which is index order once the key is fixed) and then the keys past
+        # it, and merge the two short lists.
+        band = where + [f"{key} = ?", f"id {op} ?"]
+        after = where + [f"{key} {op} ?"]
+        sql = (
+            f"SELECT * FROM ("
+            f"SELECT * FROM (SELECT {LISTING_COLUMNS} FROM workspaces WHERE {' AND '.join(band)} "
+            f"ORDER BY id {direction} LIMIT ?) "
+            f"UNION ALL SELECT * FROM (SELECT {LISTING_COLUMNS} FROM workspaces WHERE {' AND '.join(after)} "
+            f"ORDER BY {order} LIMIT ?)"
+            f") ORDER BY {order} LIMIT ?"
+        )
+        args = params + values + [limit + 1] + params + [values[0], limit + 1, limit + 1]
+    else:
+        sql = f"SELECT {LISTING_COLUMNS} FROM workspaces"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order} LIMIT ?"
+        args = params + [limit + 1]
+    rows = conn.execute(sql, args).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if key is None:
+            next_cursor = encode_cursor([last["id"]])
+        elif sort == "rating":
+            next_cursor = encode_cursor([last["rating"] or 0, last["id"]])
+        else:
+            next_cursor = encode_cursor([last["price_per_hour"], last["id"]])
+    return rows, next_cursor
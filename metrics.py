@@ -0,0 +1,176 @@
+"""In-process request and SQL metrics, rendered in the Prometheus text format.
+
+Every connection from connect_db() is an InstrumentedConnection, which times each
+statement the app executes and charges it to the current request. Statements
+slower than the threshold are logged with their EXPLAIN QUERY PLAN.
+
+Python's sqlite3 has no profile hook, and its trace hook reports statements run
+inside triggers with the outer statement's text, so timing happens here in
+execute(). For a SELECT that covers the work up to the first row, which is where
+sorting and index seeks happen.
+
+Metrics are per process: with several workers, scrape or sum each one.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, has_app_context
+
+slow_log = logging.getLogger("cowork.slowquery")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    """Labelled counters and histograms guarded by one lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._help = {}
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def inc(self, name, labels=(), value=1):
+        with self._lock:
+            key = (name, labels)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        with self._lock:
+            key = (name, labels)
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(buckets)
+            hist.observe(value)
+
+    def render(self, extra_gauges=()):
+        """Prometheus text exposition; extra_gauges is an iterable of (name, labels, value)."""
+        lines = []
+        with self._lock:
+            by_name = {}
+            for (name, labels), value in self._counters.items():
+                by_name.setdefault(name, []).append(("counter", labels, value))
+            for (name, labels), hist in self._histograms.items():
+                by_name.setdefault(name, []).append(("histogram", labels, hist))
+            for name, labels, value in extra_gauges:
+                by_name.setdefault(name, []).append(("gauge", labels, value))
+            for name in sorted(by_name):
+                entries = by_name[name]
+                kind, text = self._help.get(name, (entries[0][0], name))
+                lines.append("# HELP %s %s" % (name, text))
+                lines.append("# TYPE %s %s" % (name, kind))
+                for entry_kind, labels, value in sorted(entries, key=lambda e: e[1]):
+                    if entry_kind == "histogram":
+                        cumulative = 0
+                        for bound, count in zip(value.buckets + ("+Inf",), value.counts):
+                            cumulative += count
+                            le = bound if bound == "+Inf" else repr(float(bound))
+                            lines.append("%s_bucket%s %d" % (name, _labels(labels + (("le", le),)), cumulative))
+                        lines.append("%s_sum%s %.6f" % (name, _labels(labels), value.total))
+                        lines.append("%s_count%s %d" % (name, _labels(labels), value.count))
+                    else:
+                        lines.append("%s%s %s" % (name, _labels(labels), value))
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        '%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+registry = Registry()
+registry.describe("cowork_http_requests_total", "counter", "HTTP requests by endpoint, method and status.")
+registry.describe("cowork_http_request_duration_seconds", "histogram", "Request latency by endpoint.")
+registry.describe("cowork_sql_statements_total", "counter", "SQL statements executed, by endpoint.")
+registry.describe("cowork_sql_duration_seconds", "histogram", "Per-statement SQL time, by endpoint.")
+registry.describe("cowork_sql_statements_per_request", "histogram", "SQL statements issued by one request.")
+registry.describe("cowork_sql_seconds_per_request", "histogram", "Total SQL time of one request.")
+registry.describe("cowork_sql_slow_statements_total", "counter", "Statements slower than the slow-query threshold.")
+
+# Set from app.config["SLOW_QUERY_MS"] at startup
+slow_query_seconds = 0.1
+
+
+def _charge(conn, sql, params, elapsed):
+    """Charge one statement to the current request; params is None for executemany batches."""
+    stats = g.get("sql_stats") if has_app_context() else None
+    endpoint = "none"
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+        endpoint = g.metrics_endpoint
+    registry.observe("cowork_sql_duration_seconds", (("endpoint", endpoint),), elapsed)
+    if elapsed < slow_query_seconds:
+        return
+    registry.inc("cowork_sql_slow_statements_total", (("endpoint", endpoint),))
+    plan_text = "n/a (batch)"
+    if params is not None:
+        try:
+            plan = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, params).fetchall()
+            plan_text = "; ".join(row[-1] for row in plan)
+        except sqlite3.Error as e:
+            plan_text = "unavailable (%s)" % e
+    slow_log.warning("slow query %.1f ms [%s]: %s | plan: %s", elapsed * 1000, endpoint, " ".join(sql.split()), plan_text)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3.Connection that times execute()/executemany() and charges them to the request."""
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _charge(self, sql, parameters, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _charge(self, sql, None, time.perf_counter() - started)
+
+
+def start_request(endpoint):
+    g.metrics_started = time.perf_counter()
+    g.metrics_endpoint = endpoint or "unknown"
+    g.sql_stats = [0, 0.0]
+
+
+def finish_request(method, status):
+    started = g.get("metrics_started")
+    if started is None:
+        return
+    endpoint = g.metrics_endpoint
+    elapsed = time.perf_counter() - started
+    registry.inc("cowork_http_requests_total", (("endpoint", endpoint), ("method", method), ("status", str(status))))
+    registry.observe("cowork_http_request_duration_seconds", (("endpoint", endpoint),), elapsed)
+    count, sql_seconds = g.sql_stats
+    registry.inc("cowork_sql_statements_total", (("endpoint", endpoint),), count)
+    registry.observe("cowork_sql_statements_per_request", (("endpoint", endpoint),), count, COUNT_BUCKETS)
+    registry.observe("cowork_sql_seconds_per_request", (("endpoint", endpoint),), sql_seconds)
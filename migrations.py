@@ -0,0 +1,322 @@
+"""Versioned schema migrations keyed on PRAGMA user_version.
+
+MIGRATIONS[i] brings a database from user_version i to i + 1. Each one runs in
+its own BEGIN IMMEDIATE transaction together with the user_version bump, so a
+migration is either fully applied or not at all, and two workers starting at
+once can't apply the same step twice. Startup on an up-to-date database is a
+single pragma read.
+
+Databases created before versioning report user_version 0. The baseline steps
+below still check for the columns and tables such databases may already have,
+but they run exactly once per database.
+"""
+import time
+
+import availability
+import bookings
+import geo
+import hosts
+import listings
+import ratings
+import search
+
+SEED_WORKSPACES = (
+    # US examples (USD)
+    ("Downtown Loft Desk", "Modern desk space with fast Wi-Fi and great city view.", 12.5, 4.7, None, 'INR', None),
+    ("Creative Hub Meeting Room", "Bright meeting room ideal for workshops and client calls.", 25.0, 4.5, None, 'USD', None),
+    ("Quiet Focus Pod", "Soundproof pod for deep work and focus.", 15.0, 4.9, None, 'USD', None),
+    # Indian examples (INR) with placeholder SVGs in static/uploads
+    ("Bengaluru Startup Loft", "Cozy loft in Koramangala with reliable internet and vibrant community.", 350.0, 4.8, 'uploads/bengaluru_loft.svg', 'INR', None),
+    ("Delhi Meeting Suite", "Professional meeting suite in Connaught Place with presentation setup.", 1200.0, 4.6, 'uploads/delhi_meeting.svg', 'INR', None),
+    ("Mumbai Focus Pod", "Private focus pod near Bandra with ergonomic chair and quiet ambiance.", 450.0, 4.7, 'uploads/mumbai_pod.svg', 'INR', None),
+    ("Hyderabad Creative Hub", "Spacious creative workspace with whiteboards and natural light.", 800.0, 4.5, 'uploads/hyderabad_hub.svg', 'INR', None),
+)
+
+# Neighbourhood centres for the Indian examples; the US ones don't name a city
+SEED_COORDINATES = (
+    ("Bengaluru Startup Loft", 12.9352, 77.6245),  # Koramangala
+    ("Delhi Meeting Suite", 28.6315, 77.2167),  # Connaught Place
+    ("Mumbai Focus Pod", 19.0596, 72.8295),  # Bandra
+    ("Hyderabad Creative Hub", 17.4435, 78.3772),  # HITEC City
+)
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute("PRAGMA table_info(%s)" % table)}
+
+
+def _has_table(conn, name):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def create_base_tables(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS workspaces (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT,
+            price_per_hour REAL NOT NULL,
+            rating REAL,
+            image_path TEXT,
+            currency TEXT DEFAULT 'USD',
+            owner_id INTEGER,
+            FOREIGN KEY(owner_id) REFERENCES users(id)
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS bookings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            workspace_id INTEGER NOT NULL,
+            booking_date TEXT NOT NULL,
+            start_time TEXT,
+            hours INTEGER NOT NULL,
+            total_price REAL NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY(user_id) REFERENCES users(id),
+            FOREIGN KEY(workspace_id) REFERENCES workspaces(id)
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS reviews (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            workspace_id INTEGER NOT NULL,
+            rating INTEGER NOT NULL,
+            comment TEXT,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY(user_id) REFERENCES users(id),
+            FOREIGN KEY(workspace_id) REFERENCES workspaces(id)
+        );
+        """
+    )
+    # Databases from before these columns existed
+    if "currency" not in _columns(conn, "workspaces"):
+        conn.execute("ALTER TABLE workspaces ADD COLUMN currency TEXT DEFAULT 'USD'")
+    booking_cols = _columns(conn, "bookings")
+    if "booking_date" not in booking_cols:
+        conn.execute("ALTER TABLE bookings ADD COLUMN booking_date TEXT")
+    if "start_time" not in booking_cols:
+        conn.execute("ALTER TABLE bookings ADD COLUMN start_time TEXT")
+
+
+def seed_example_workspaces(conn):
+    if conn.execute("SELECT 1 FROM workspaces LIMIT 1").fetchone() is None:
+        seed = SEED_WORKSPACES
+    elif conn.execute("SELECT 1 FROM workspaces WHERE name = ?", ("Bengaluru Startup Loft",)).fetchone() is None:
+        seed = [row for row in SEED_WORKSPACES if row[5] == 'INR' and row[4]]
+    else:
+        return
+    conn.executemany(
+        """
+        INSERT INTO workspaces (name, description, price_per_hour, rating, image_path, currency, owner_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        seed,
+    )
+
+
+def add_review_aggregates(conn):
+    existing = _columns(conn, "workspaces")
+    missing = [(n, d) for n, d in ratings.AGGREGATE_COLUMNS if n not in existing]
+    for name, decl in missing:
+        conn.execute(f"ALTER TABLE workspaces ADD COLUMN {name} {decl}")
+    for trigger in ratings.RATING_TRIGGERS:
+        conn.execute(trigger)
+    if missing:
+        ratings.recompute_aggregates(conn, commit=False)
+
+
+def add_explore_indexes(conn):
+    for index in listings.EXPLORE_INDEXES:
+        conn.execute(index)
+
+
+def add_search_index(conn):
+    existed = _has_table(conn, "workspaces_fts")
+    for statement in search.SEARCH_SCHEMA:
+        conn.execute(statement)
+    if not existed:
+        search.rebuild_index(conn, commit=False)
+
+
+def add_occupancy(conn):
+    conn.execute(availability.OCCUPANCY_SCHEMA)
+    if conn.execute("SELECT 1 FROM workspace_occupancy LIMIT 1").fetchone() is None:
+        availability.rebuild_occupancy(conn, commit=False)
+
+
+def add_booking_and_review_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_user_created ON bookings (user_id, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_workspace_date ON bookings (workspace_id, booking_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reviews_workspace_created ON reviews (workspace_id, created_at)")
+
+
+def add_workspace_name_index(conn):
+    # Bulk imports upsert workspaces by name
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_workspaces_name ON workspaces (name)")
+
+
+def add_user_booking_summaries(conn):
+    for statement in bookings.SUMMARY_SCHEMA:
+        conn.execute(statement)
+    bookings.recompute_summaries(conn, commit=False)
+
+
+def add_host_stats(conn):
+    for statement in hosts.STATS_SCHEMA:
+        conn.execute(statement)
+    hosts.recompute_stats(conn, commit=False)
+
+
+def add_workspace_versions(conn):
+    # Any change to a workspace row (including review aggregates) bumps its version,
+    # which the API turns into ETag/Last-Modified
+    existing = _columns(conn, "workspaces")
+    if "version" not in existing:
+        conn.execute("ALTER TABLE workspaces ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+    if "updated_at" not in existing:
+        conn.execute("ALTER TABLE workspaces ADD COLUMN updated_at TEXT")
+    conn.execute("UPDATE workspaces SET updated_at = strftime('%Y-%m-%d %H:%M:%S', 'now') WHERE updated_at IS NULL")
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS workspaces_version_insert AFTER INSERT ON workspaces
+        WHEN NEW.updated_at IS NULL
+        BEGIN
+            UPDATE workspaces SET updated_at = strftime('%Y-%m-%d %H:%M:%S', 'now') WHERE id = NEW.id;
+        END;
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS workspaces_version_update AFTER UPDATE ON workspaces
+        WHEN NEW.version = OLD.version AND NEW.updated_at IS OLD.updated_at
+        BEGIN
+            UPDATE workspaces
+            SET version = OLD.version + 1, updated_at = strftime('%Y-%m-%d %H:%M:%S', 'now')
+            WHERE id = NEW.id;
+        END;
+        """
+    )
+
+
+def add_idempotency_keys(conn):
+    # Retried form submissions carry the same key; the partial unique index keeps
+    # rows written without one (imports, older clients) unconstrained
+    for table in ("bookings", "reviews"):
+        if "idempotency_key" not in _columns(conn, table):
+            conn.execute("ALTER TABLE %s ADD COLUMN idempotency_key TEXT" % table)
+        conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_%s_idempotency ON %s (user_id, idempotency_key) "
+            "WHERE idempotency_key IS NOT NULL" % (table, table)
+        )
+
+
+def add_workspace_coordinates(conn):
+    existing = _columns(conn, "workspaces")
+    for column in ("latitude", "longitude"):
+        if column not in existing:
+            conn.execute("ALTER TABLE workspaces ADD COLUMN %s REAL" % column)
+    for statement in geo.GEO_SCHEMA:
+        conn.execute(statement)
+    # The triggers index the seeds as they are updated
+    conn.executemany(
+        "UPDATE workspaces SET latitude = ?, longitude = ? WHERE name = ? AND latitude IS NULL",
+        [(lat, lon, name) for name, lat, lon in SEED_COORDINATES],
+    )
+
+
+def clear_rating_without_reviews(conn):
+    # The delete trigger used to leave the last review's average behind; recreate it
+    conn.execute("DROP TRIGGER IF EXISTS reviews_aggregate_delete")
+    for trigger in ratings.RATING_TRIGGERS:
+        conn.execute(trigger)
+
+
+def spread_stats_hours(conn):
+    # Booked hours used to be counted in full on the booking date, overnight spill and all;
+    # the triggers now spread them over the days they cover
+    conn.execute("DROP TRIGGER IF EXISTS bookings_stats_insert")
+    conn.execute("DROP TRIGGER IF EXISTS bookings_stats_delete")
+    for statement in hosts.STATS_SCHEMA:
+        conn.execute(statement)
+    hosts.recompute_stats(conn, commit=False)
+
+
+# Append only: never reorder or edit a migration that has shipped
+MIGRATIONS = (
+    create_base_tables,
+    seed_example_workspaces,
+    add_review_aggregates,
+    add_explore_indexes,
+    add_search_index,
+    add_occupancy,
+    add_booking_and_review_indexes,
+    add_workspace_name_index,
+    add_user_booking_summaries,
+    add_host_stats,
+    add_workspace_versions,
+    add_idempotency_keys,
+    add_workspace_coordinates,
+    clear_rating_without_reviews,
+    spread_stats_hours,
+)
+
+LATEST = len(MIGRATIONS)
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def pending(conn):
+    """[(version, name), ...] for the migrations not yet applied."""
+    return [(v + 1, MIGRATIONS[v].__name__) for v in range(current_version(conn), LATEST)]
+
+
+def migrate(conn, target=LATEST, progress=None):
+    """Apply pending migrations up to `target`; returns [(version, name, seconds), ...].
+
+    `progress`, if given, is called with (version, name) before each step.
+    """
+    applied = []
+    if current_version(conn) >= target:
+        return applied
+    if conn.in_transaction:
+        conn.commit()
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-read under the write lock: another worker may have just migrated
+            version = current_version(conn)
+            if version >= target:
+                conn.rollback()
+                return applied
+            step = MIGRATIONS[version]
+            if progress is not None:
+                progress(version + 1, step.__name__)
+            started = time.perf_counter()
+            step(conn)
+            conn.execute("PRAGMA user_version = %d" % (version + 1))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied.append((version + 1, step.__name__, time.perf_counter() - started))
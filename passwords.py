@@ -0,0 +1,123 @@
+"""Password hashing off the request thread, with backpressure and attempt limiting.
+
+Hashing is deliberately slow (scrypt takes ~100 ms), so login and register hand it
+to a small process pool instead of burning the web worker's CPU. At most
+`max_pending` hashes may be queued; beyond that HashingBusy is raised immediately
+so a burst of logins can't pile up behind each other. A hash that doesn't finish
+within `timeout`, or a pool whose worker died, also surfaces as HashingBusy. AttemptLimiter rejects
+floods per IP and per account before they cost a hash at all.
+"""
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = "scrypt:32768:8:1"
+
+
+class HashingBusy(Exception):
+    """Raised when too many hashes are already queued, or the pool can't answer in time."""
+
+
+def _method_of(pwhash):
+    return pwhash.split("$", 1)[0]
+
+
+def needs_rehash(pwhash, method=DEFAULT_METHOD):
+    """True when a stored hash was made with different parameters than `method`."""
+    return _method_of(pwhash) != method
+
+
+def _verify_and_upgrade(pwhash, password, method):
+    # Runs in the pool: one round trip verifies and, if needed, produces the upgraded hash
+    if not check_password_hash(pwhash, password):
+        return False, None
+    if needs_rehash(pwhash, method):
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+class PasswordHasher:
+    """Hash and verify passwords either inline or in a bounded process pool."""
+
+    def __init__(self, method=DEFAULT_METHOD, workers=2, max_pending=16, offload=True, timeout=10.0):
+        self.method = method
+        self.workers = workers
+        self.offload = offload
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _run(self, fn, *args):
+        if not self.offload:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            with self._pool_lock:
+                if self._pool is None:
+                    # spawn, not fork: the web process has threads and open SQLite handles
+                    self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+                pool = self._pool
+            return pool.submit(fn, *args).result(timeout=self.timeout)
+        except TimeoutError:
+            raise HashingBusy()
+        except BrokenProcessPool:
+            # A pool process died (e.g. OOM-killed); start a fresh pool on the next call
+            with self._pool_lock:
+                if self._pool is pool:
+                    self._pool = None
+            pool.shutdown(wait=False)
+            raise HashingBusy()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        """Return (ok, upgraded_hash); upgraded_hash is set when the stored parameters are outdated."""
+        return self._run(_verify_and_upgrade, pwhash, password, self.method)
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+class AttemptLimiter:
+    """Sliding-window counter: at most `limit` attempts per key within `window` seconds."""
+
+    def __init__(self, limit, window=60.0):
+        self.limit = limit
+        self.window = window
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        """Record an attempt for `key`; returns False if it is over the limit."""
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._attempts.setdefault(key, deque())
+            while attempts and attempts[0] <= now - self.window:
+                attempts.popleft()
+            if len(attempts) >= self.limit:
+                return False
+            attempts.append(now)
+            if len(self._attempts) > 10000:
+                self._prune(now)
+            return True
+
+    def _prune(self, now):
+        for key in [k for k, v in self._attempts.items() if not v or v[-1] <= now - self.window]:
+            del self._attempts[key]
+
+    def reset(self, key):
+        with self._lock:
+            self._attempts.pop(key, None)
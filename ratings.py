@@ -0,0 +1,118 @@
+"""Review aggregates stored on the workspaces row.
+
+`review_count` and `rating_sum` are maintained by triggers on `reviews`, and
+`rating` holds their average once a workspace has at least one review, so listings
+read a real average without touching the reviews table. Until the first review
+arrives, `rating` keeps the value the owner entered in new_workspace. The first
+review replaces that value, so deleting the last review leaves `rating` NULL.
+
+Reviews themselves are read a page at a time, newest first, through the
+reviews(workspace_id, created_at) index.
+"""
+from datetime import datetime
+
+from listings import decode_cursor, encode_cursor
+
+REVIEWS_PAGE_SIZE = 10
+
+AGGREGATE_COLUMNS = (
+    ("review_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("rating_sum", "INTEGER NOT NULL DEFAULT 0"),
+)
+
+RATING_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS reviews_aggregate_insert AFTER INSERT ON reviews
+    BEGIN
+        UPDATE workspaces
+        SET review_count = review_count + 1,
+            rating_sum = rating_sum + NEW.rating,
+            rating = (rating_sum + NEW.rating) * 1.0 / (review_count + 1)
+        WHERE id = NEW.workspace_id;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS reviews_aggregate_delete AFTER DELETE ON reviews
+    BEGIN
+        UPDATE workspaces
+        SET review_count = review_count - 1,
+            rating_sum = rating_sum - OLD.rating,
+            rating = CASE WHEN review_count > 1
+                          THEN (rating_sum - OLD.rating) * 1.0 / (review_count - 1)
+                          ELSE NULL END
+        WHERE id = OLD.workspace_id;
+    END;
+    """,
+)
+
+
+def recompute_aggregates(conn, commit=True):
+    """Recompute review_count, rating_sum and rating for every workspace in one pass."""
+    # A workspace whose reviews are all gone has no average left; one never reviewed keeps the owner's rating
+    conn.execute(
+        "UPDATE workspaces SET rating = CASE WHEN review_count > 0 THEN NULL ELSE rating END, "
+        "review_count = 0, rating_sum = 0"
+    )
+    cur = conn.execute(
+        """
+        UPDATE workspaces
+        SET review_count = agg.cnt,
+            rating_sum = agg.total,
+            rating = agg.total * 1.0 / agg.cnt
+        FROM (
+            SELECT workspace_id, COUNT(*) AS cnt, SUM(rating) AS total
+            FROM reviews
+            GROUP BY workspace_id
+        ) AS agg
+        WHERE workspaces.id = agg.workspace_id
+        """
+    )
+    if commit:
+        conn.commit()
+    return cur.rowcount
+
+
+def add_review(conn, user_id, workspace_id, rating, comment=None, idempotency_key=None, created_at=None,
+               commit=True):
+    """Insert a review and return its id; a repeat of the same idempotency key returns the first one's id."""
+    # A repeated key hits the partial unique index and writes nothing, even when both
+    # submissions race; the first submission's id is returned instead
+    cur = conn.execute(
+        "INSERT INTO reviews (user_id, workspace_id, rating, comment, created_at, idempotency_key) "
+        "VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (user_id, idempotency_key) WHERE idempotency_key IS NOT NULL DO NOTHING",
+        (user_id, workspace_id, rating, comment, created_at or datetime.utcnow().isoformat(), idempotency_key),
+    )
+    review_id = cur.lastrowid
+    if cur.rowcount == 0:
+        review_id = conn.execute(
+            "SELECT id FROM reviews WHERE user_id = ? AND idempotency_key = ?", (user_id, idempotency_key)
+        ).fetchone()[0]
+    if commit:
+        conn.commit()
+    return review_id
+
+
+def reviews_page(conn, workspace_id, cursor=None, limit=REVIEWS_PAGE_SIZE):
+    """Return (rows, next_cursor) for one page of a workspace's reviews, newest first."""
+    where, params = "r.workspace_id = ?", [workspace_id]
+    if cursor is not None:
+        values = decode_cursor(cursor, (str, int))
+        where += " AND (r.created_at, r.id) < (?, ?)"
+        params.extend(values)
+    rows = conn.execute(
+        f"""
+        SELECT r.id, r.user_id, r.rating, r.comment, r.created_at, u.username
+        FROM reviews r
+        LEFT JOIN users u ON u.id = r.user_id
+        WHERE {where}
+        ORDER BY r.created_at DESC, r.id DESC
+        LIMIT ?
+        """,
+        params + [limit + 1],
+    ).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1]["created_at"], rows[-1]["id"]])
+    return rows, next_cursor
@@ -1,10 +1,41 @@
+import argparse
 import os
 import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 ROOT = os.path.normpath(os.path.join(BASE_DIR, '..'))
-UPLOAD_DIR = os.path.join(ROOT, 'static', 'uploads')
+STATIC_DIR = os.path.join(ROOT, 'static')
+UPLOAD_DIR = os.path.join(STATIC_DIR, 'uploads')
 DB = os.path.join(ROOT, 'cowork.db')
+sys.path.insert(0, ROOT)
+
+import images  # noqa: E402
+
+parser = argparse.ArgumentParser(description="Attach uploaded images to workspaces without one.")
+parser.add_argument('--derivatives', action='store_true',
+                    help='instead, build card/detail JPEG + WebP derivatives for every existing upload')
+parser.add_argument('--workers', type=int, default=os.cpu_count(), help='processes used with --derivatives')
+parser.add_argument('--force', action='store_true', help='rebuild derivatives that already exist')
+args = parser.parse_args()
+
+if args.derivatives:
+    if images.Image is None:
+        print('Pillow is not installed; cannot build derivatives.')
+        raise SystemExit(1)
+    paths = sorted(
+        f"uploads/{f}" for f in os.listdir(UPLOAD_DIR)
+        if os.path.isfile(os.path.join(UPLOAD_DIR, f)) and not f.startswith('.')
+    )
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        written = pool.map(images.generate_derivatives, [STATIC_DIR] * len(paths), paths, [args.force] * len(paths))
+        for path, count in zip(paths, written):
+            print(f"{path}: {count} files written")
+    print(f"Processed {len(paths)} uploads in {time.perf_counter() - started:.1f}s.")
+    raise SystemExit(0)
 
 # List candidate images (ignore our svg placeholders only if needed)
 candidates = [f for f in os.listdir(UPLOAD_DIR) if os.path.isfile(os.path.join(UPLOAD_DIR, f))]
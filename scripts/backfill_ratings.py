@@ -0,0 +1,37 @@
+"""Recompute review_count / rating_sum / rating on every workspace from the reviews table.
+
+    python scripts/backfill_ratings.py [--db path/to/cowork.db]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.normpath(os.path.join(BASE_DIR, '..'))
+sys.path.insert(0, ROOT)
+
+import ratings  # noqa: E402
+
+parser = argparse.ArgumentParser(description="Backfill workspace rating aggregates.")
+parser.add_argument("--db", default=os.path.join(ROOT, 'cowork.db'))
+args = parser.parse_args()
+
+if not os.path.exists(args.db):
+    print('Database file not found:', args.db)
+    raise SystemExit(1)
+
+conn = sqlite3.connect(args.db)
+cols = [c[1] for c in conn.execute("PRAGMA table_info(workspaces)").fetchall()]
+for name, decl in ratings.AGGREGATE_COLUMNS:
+    if name not in cols:
+        conn.execute(f"ALTER TABLE workspaces ADD COLUMN {name} {decl}")
+for trigger in ratings.RATING_TRIGGERS:
+    conn.execute(trigger)
+
+started = time.perf_counter()
+updated = ratings.recompute_aggregates(conn)
+elapsed = time.perf_counter() - started
+conn.close()
+print(f"Recomputed aggregates for {updated} reviewed workspaces in {elapsed:.3f}s.")
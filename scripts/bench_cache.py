@@ -0,0 +1,74 @@
+"""Measure /explore and /workspace/<id> throughput with the query cache on and off.
+
+    python scripts/bench_cache.py --rows 20000 --requests 2000 [--backend file]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.normpath(os.path.join(BASE_DIR, '..'))
+sys.path.insert(0, ROOT)
+
+import app as cowork  # noqa: E402
+
+
+def seed(rows, reviews):
+    cowork.init_db()
+    conn = cowork.connect_db()
+    rnd = random.Random(3)
+    conn.execute("INSERT INTO users (username, email, password_hash) VALUES ('bench', 'bench@example.com', 'x')")
+    conn.executemany(
+        "INSERT INTO workspaces (name, description, price_per_hour, rating, currency) VALUES (?, ?, ?, ?, ?)",
+        [("Space %d" % i, "Seeded workspace", rnd.uniform(5, 50), rnd.uniform(3, 5), "USD") for i in range(rows)],
+    )
+    conn.executemany(
+        "INSERT INTO reviews (user_id, workspace_id, rating, comment, created_at) VALUES (1, ?, ?, 'ok', ?)",
+        [(rnd.randint(1, 50), rnd.randint(1, 5), "2030-01-01T00:00:%02d" % (i % 60)) for i in range(reviews)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def run(client, urls, requests):
+    rnd = random.Random(11)
+    started = time.perf_counter()
+    for _ in range(requests):
+        resp = client.get(rnd.choice(urls))
+        assert resp.status_code == 200, resp.status_code
+    elapsed = time.perf_counter() - started
+    return round(requests / elapsed, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--reviews", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--backend", choices=("memory", "file"), default="memory")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cowork.create_app({
+            "DATABASE": os.path.join(tmp, "cache.db"),
+            "CACHE_BACKEND": args.backend,
+            "CACHE_DIR": os.path.join(tmp, "cache"),
+        })
+        seed(args.rows, args.reviews)
+        urls = ["/explore", "/explore?sort=price", "/explore?currency=USD&min_rating=4"]
+        urls += ["/workspace/%d" % i for i in range(1, 51)]
+        client = cowork.app.test_client()
+        results = {}
+        for enabled in (False, True):
+            cowork.create_app({"CACHE_ENABLED": enabled})
+            rps = run(client, urls, args.requests)
+            results["cache_on" if enabled else "cache_off"] = {"requests_per_sec": rps, **cowork.get_cache().stats()}
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
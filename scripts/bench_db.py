@@ -0,0 +1,126 @@
+"""Compare the old connect-per-call SQLite access with the pooled WAL connection layer.
+
+Runs against a throwaway database seeded with example workspaces, so the real
+cowork.db is never touched.
+
+    python scripts/bench_db.py --threads 8 --seconds 5
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.normpath(os.path.join(BASE_DIR, '..'))
+sys.path.insert(0, ROOT)
+
+import app as cowork  # noqa: E402
+
+EXPLORE_SQL = "SELECT * FROM workspaces ORDER BY rating DESC"
+BOOKING_SQL = """
+    INSERT INTO bookings (user_id, workspace_id, booking_date, start_time, hours, total_price, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def legacy_connect(path):
+    # What get_db_connection() used to do: a fresh default-pragma connection per call
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def make_db(path, wal):
+    cowork.create_app({"DATABASE": path})
+    cowork.init_db()
+    conn = sqlite3.connect(path)
+    if not wal:
+        conn.execute("PRAGMA journal_mode = DELETE")
+    conn.executemany(
+        "INSERT INTO workspaces (name, description, price_per_hour, rating, currency) VALUES (?, ?, ?, ?, ?)",
+        [("Bench space %d" % i, "Seeded for benchmarking", 10.0 + i % 50, (i % 50) / 10.0, "USD") for i in range(500)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def run(mode, path, threads, seconds, writers):
+    pool = cowork.ConnectionPool(path, threads + writers) if mode == "pooled" else None
+    stop = time.perf_counter() + seconds
+    counts = {"reads": 0, "writes": 0, "locked": 0}
+    lock = threading.Lock()
+
+    def checkout():
+        return pool.acquire() if pool else legacy_connect(path)
+
+    def checkin(conn):
+        if pool:
+            pool.release(conn)
+        else:
+            conn.close()
+
+    def reader():
+        n = 0
+        while time.perf_counter() < stop:
+            conn = checkout()
+            conn.execute(EXPLORE_SQL).fetchall()
+            checkin(conn)
+            n += 1
+        with lock:
+            counts["reads"] += n
+
+    def writer():
+        n = locked = 0
+        while time.perf_counter() < stop:
+            conn = checkout()
+            try:
+                conn.execute(BOOKING_SQL, (1, 1, "2030-01-01", "09:00", 1, 10.0, datetime.utcnow().isoformat()))
+                conn.commit()
+                n += 1
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                conn.rollback()
+                locked += 1
+            checkin(conn)
+        with lock:
+            counts["writes"] += n
+            counts["locked"] += locked
+
+    workers = [threading.Thread(target=reader) for _ in range(threads)]
+    workers += [threading.Thread(target=writer) for _ in range(writers)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    if pool:
+        pool.close_all()
+    return {
+        "mode": mode,
+        "reads_per_sec": round(counts["reads"] / seconds, 1),
+        "writes_per_sec": round(counts["writes"] / seconds, 1),
+        "locked_errors": counts["locked"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8, help="concurrent reader threads")
+    parser.add_argument("--writers", type=int, default=2, help="concurrent booking writer threads")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("legacy", "pooled"):
+            path = os.path.join(tmp, mode + ".db")
+            make_db(path, wal=(mode == "pooled"))
+            result = run(mode, path, args.threads, args.seconds, args.writers)
+            print(result)
+
+
+if __name__ == "__main__":
+    main()
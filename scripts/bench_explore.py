@@ -0,0 +1,114 @@
+"""Seed a large workspaces table and measure /explore latency per filter/sort combination.
+
+Each combination is requested through the Flask test client, first page and a
+few pages deep (following the keyset cursor), and p50/p99 are reported in ms.
+
+    python scripts/bench_explore.py --rows 100000 --requests 200
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.normpath(os.path.join(BASE_DIR, '..'))
+sys.path.insert(0, ROOT)
+
+import app as cowork  # noqa: E402
+
+COMBINATIONS = {
+    "default": {},
+    "currency": {"currency": "INR"},
+    "price_range": {"min_price": "100", "max_price": "400", "sort": "price"},
+    "currency_price_sort": {"currency": "USD", "sort": "price"},
+    "min_rating": {"min_rating": "4.0"},
+    "currency_min_rating": {"currency": "USD", "min_rating": "4.5"},
+    "newest": {"sort": "newest"},
+    "currency_newest": {"currency": "INR", "sort": "newest"},
+}
+NEXT_LINK = re.compile(r'href="(/explore\?[^"]*cursor=[^"]*)"')
+
+
+def seed(path, rows):
+    cowork.create_app({"DATABASE": path})
+    cowork.init_db()
+    conn = cowork.connect_db(path)
+    rnd = random.Random(42)
+    batch = []
+    for i in range(rows):
+        currency = rnd.choice(("USD", "INR"))
+        price = round(rnd.uniform(5, 60), 2) if currency == "USD" else float(rnd.randrange(200, 2000, 50))
+        rating = round(rnd.uniform(3.0, 5.0), 1) if rnd.random() > 0.1 else None
+        batch.append(("Space %d" % i, "Seeded workspace %d" % i, price, rating, currency))
+        if len(batch) == 5000:
+            conn.executemany(
+                "INSERT INTO workspaces (name, description, price_per_hour, rating, currency) VALUES (?, ?, ?, ?, ?)",
+                batch,
+            )
+            batch = []
+    if batch:
+        conn.executemany(
+            "INSERT INTO workspaces (name, description, price_per_hour, rating, currency) VALUES (?, ?, ?, ?, ?)",
+            batch,
+        )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def measure(client, url, requests):
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        resp = client.get(url)
+        samples.append((time.perf_counter() - started) * 1000)
+        assert resp.status_code == 200, (url, resp.status_code)
+    return {"p50_ms": round(percentile(samples, 50), 2), "p99_ms": round(percentile(samples, 99), 2)}
+
+
+def deep_url(client, url, pages):
+    # Follow "Next page" links to get a cursor several pages in
+    for _ in range(pages):
+        match = NEXT_LINK.search(client.get(url).get_data(as_text=True))
+        if not match:
+            break
+        url = match.group(1).replace("&amp;", "&")
+    return url
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=200, help="requests per combination")
+    parser.add_argument("--deep", type=int, default=20, help="pages to follow for the deep-page measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "explore.db")
+        started = time.perf_counter()
+        seed(path, args.rows)
+        print("seeded %d workspaces in %.1fs" % (args.rows, time.perf_counter() - started), file=sys.stderr)
+
+        client = cowork.app.test_client()
+        results = {}
+        for name, params in COMBINATIONS.items():
+            query = "&".join("%s=%s" % kv for kv in params.items())
+            url = "/explore" + ("?" + query if query else "")
+            results[name] = {
+                "first_page": measure(client, url, args.requests),
+                "deep_page": measure(client, deep_url(client, url, args.deep), args.requests),
+            }
+        print(json.dumps({"rows": args.rows, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
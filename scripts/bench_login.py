@@ -0,0 +1,110 @@
+"""Login throughput and concurrent page latency with password hashing offloaded vs inline.
+
+Login threads post valid credentials to /login while page threads fetch /explore;
+the attempt limiter is lifted so only hashing cost is measured.
+
+    python scripts/bench_login.py --seconds 5 --login-threads 8 --page-threads 4
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.normpath(os.path.join(BASE_DIR, '..'))
+sys.path.insert(0, ROOT)
+
+import app as cowork  # noqa: E402
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 2)
+
+
+def run(offload, seconds, login_threads, page_threads):
+    cowork.create_app({"PASSWORD_HASH_OFFLOAD": offload})
+    hasher = cowork.get_hasher()
+    if offload:
+        hasher.hash("warm-up")  # start the pool outside the measured window
+
+    stop = time.perf_counter() + seconds
+    logins, busy, page_ms = [], [], []
+    lock = threading.Lock()
+
+    def login_worker(i):
+        client = cowork.app.test_client()
+        done = rejected = 0
+        while time.perf_counter() < stop:
+            resp = client.post("/login", data={"username": "user%d" % i, "password": "secret-%d" % i})
+            if "dashboard" in resp.headers.get("Location", ""):
+                done += 1
+            else:
+                rejected += 1
+        with lock:
+            logins.append(done)
+            busy.append(rejected)
+
+    def page_worker():
+        client = cowork.app.test_client()
+        samples = []
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            client.get("/explore")
+            samples.append((time.perf_counter() - started) * 1000)
+        with lock:
+            page_ms.extend(samples)
+
+    threads = [threading.Thread(target=login_worker, args=(i,)) for i in range(login_threads)]
+    threads += [threading.Thread(target=page_worker) for _ in range(page_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    hasher.shutdown()
+    return {
+        "mode": "offload" if offload else "inline",
+        "logins_per_sec": round(sum(logins) / seconds, 1),
+        "busy_rejections": sum(busy),
+        "page_p50_ms": percentile(page_ms, 50),
+        "page_p99_ms": percentile(page_ms, 99),
+        "pages_per_sec": round(len(page_ms) / seconds, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--login-threads", type=int, default=8)
+    parser.add_argument("--page-threads", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cowork.create_app({
+            "DATABASE": os.path.join(tmp, "login.db"),
+            "CACHE_ENABLED": False,
+            "LOGIN_ATTEMPTS_PER_IP": 10 ** 9,
+            "LOGIN_ATTEMPTS_PER_ACCOUNT": 10 ** 9,
+        })
+        cowork.init_db()
+        hasher = cowork.get_hasher()
+        conn = cowork.connect_db()
+        conn.executemany(
+            "INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)",
+            [("user%d" % i, "user%d@example.com" % i, hasher.hash("secret-%d" % i)) for i in range(args.login_threads)],
+        )
+        conn.commit()
+        conn.close()
+        hasher.shutdown()
+
+        results = [run(offload, args.seconds, args.login_threads, args.page_threads) for offload in (False, True)]
+        print(json.dumps({"cpus": os.cpu_count(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compare FTS5 search latency with a LIKE '%...%' scan on a large seeded table.
+
+    python scripts/bench_search.py --rows 100000 --repeat 50
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.normpath(os.path.join(BASE_DIR, '..'))
+sys.path.insert(0, ROOT)
+
+import app as cowork  # noqa: E402
+import search  # noqa: E402
+
+AREAS = ["Koramangala", "Indiranagar", "Connaught Place", "Bandra", "Andheri", "HITEC City",
+         "Whitefield", "Powai", "Salt Lake", "Downtown", "Midtown", "SoHo"]
+KINDS = ["desk", "meeting room", "focus pod", "studio", "loft", "boardroom", "phone booth"]
+PERKS = ["fast Wi-Fi", "whiteboards", "natural light", "standing desks", "free coffee",
+         "presentation setup", "ergonomic chairs", "quiet zone", "rooftop terrace", "parking"]
+QUERIES = ["Koramangala", "meeting room", "focus", "rooftop terrace", "Bandra studio", "zzz-no-match"]
+
+
+def seed(path, rows):
+    cowork.create_app({"DATABASE": path})
+    cowork.init_db()
+    conn = cowork.connect_db(path)
+    rnd = random.Random(7)
+    batch = []
+    for i in range(rows):
+        area, kind = rnd.choice(AREAS), rnd.choice(KINDS)
+        desc = "A %s in %s with %s and %s." % (kind, area, rnd.choice(PERKS), rnd.choice(PERKS))
+        batch.append(("%s %s %d" % (area, kind.title(), i), desc, rnd.uniform(5, 50), "USD"))
+    conn.executemany(
+        "INSERT INTO workspaces (name, description, price_per_hour, currency) VALUES (?, ?, ?, ?)", batch
+    )
+    conn.commit()
+    return conn
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {"p50_ms": round(samples[len(samples) // 2], 3), "max_ms": round(samples[-1], 3)}
+
+
+def like_scan(conn, text):
+    # Every word must appear in name or description, like the FTS AND query. Name hits
+    # rank first, which (like any relevance order) forces a scan of every matching row.
+    where, params, name_hits = [], [], []
+    for word in text.split():
+        where.append("(name LIKE ? OR description LIKE ?)")
+        params += ["%" + word + "%"] * 2
+        name_hits.append("(name LIKE ?)")
+    sql = (
+        "SELECT id, name FROM workspaces WHERE " + " AND ".join(where)
+        + " ORDER BY " + " + ".join(name_hits) + " DESC, id LIMIT ?"
+    )
+    words = ["%" + word + "%" for word in text.split()]
+    return conn.execute(sql, params + words + [search.PAGE_SIZE]).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        conn = seed(os.path.join(tmp, "search.db"), args.rows)
+        print("seeded and indexed %d rows in %.1fs" % (args.rows, time.perf_counter() - started), file=sys.stderr)
+        results = {}
+        for q in QUERIES:
+            results[q] = {
+                "fts5": timed(lambda: search.search_workspaces(conn, q), args.repeat),
+                "like": timed(lambda: like_scan(conn, q), args.repeat),
+            }
+        conn.close()
+        print(json.dumps({"rows": args.rows, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Query-count regression check: every route must stay within its SQL statement budget.
+
+Each route is requested as a logged-in user against a throwaway database, with
+the query cache off so the numbers reflect what a cold request costs. Only statements
+the app sends are counted (not BEGIN/COMMIT, pragmas or trigger bodies). Exits non-zero
+if any route goes over budget.
+
+    python scripts/check_query_counts.py
+"""
+import os
+import sys
+import tempfile
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.normpath(os.path.join(BASE_DIR, '..'))
+sys.path.insert(0, ROOT)
+
+import app as cowork  # noqa: E402
+import metrics  # noqa: E402
+
+# (method, url, form data, max statements)
+ROUTES = [
+    ("GET", "/", None, 0),
+    ("GET", "/login", None, 0),
+    ("GET", "/register", None, 0),
+    ("GET", "/explore", None, 1),
+    ("GET", "/explore?currency=INR&sort=price", None, 1),
+    # The near-me search widens 1 -> 2 -> 4 -> 8 -> 10 km around a sparse seed database
+    ("GET", "/explore?near=12.93,77.62", None, 6),
+    ("GET", "/search?q=focus", None, 1),
+    ("GET", "/workspace/1", None, 2),
+    ("GET", "/workspace/1/availability?date=2030-01-01", None, 2),
+    ("GET", "/workspace/1/reviews", None, 1),
+    ("GET", "/workspaces/new", None, 0),
+    ("GET", "/dashboard", None, 3),
+    ("GET", "/dashboard?view=past", None, 3),
+    ("GET", "/host", None, 2),
+    ("GET", "/host/stats?grain=month", None, 3),
+    ("GET", "/api/v1/workspaces", None, 1),
+    ("GET", "/api/v1/workspaces?ids=1,2,3", None, 1),
+    ("GET", "/api/v1/workspaces/1", None, 1),
+    ("GET", "/api/v1/workspaces/1/reviews", None, 2),
+    ("GET", "/api/v1/workspaces/1/availability?date=2030-01-01", None, 2),
+    ("GET", "/api/v1/me/bookings", None, 4),
+    ("POST", "/workspace/1/review", {"rating": "5", "comment": "Great"}, 1),
+    ("POST", "/workspace/1", {"booking_date": "2030-01-01", "start_time": "09:00", "hours": "2"}, 5),
+]
+SKIPPED = ("BEGIN", "COMMIT", "ROLLBACK", "PRAGMA")
+
+statements = []
+_connect_db = cowork.connect_db
+
+
+class CountingConnection(metrics.InstrumentedConnection):
+    # Counts statements the app issues; a trace callback would also report every
+    # statement run inside triggers and the FTS5 module, which aren't round trips.
+    def execute(self, sql, *args):
+        if not sql.lstrip().upper().startswith(SKIPPED):
+            statements.append(sql)
+        return super().execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        statements.append(sql)
+        return super().executemany(sql, *args)
+
+
+def counting_connect_db(path=None, factory=CountingConnection):
+    return _connect_db(path, factory=factory)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        cowork.create_app({"DATABASE": os.path.join(tmp, "queries.db"), "CACHE_ENABLED": False})
+        cowork.init_db()
+        cowork.connect_db = counting_connect_db
+
+        client = cowork.app.test_client()
+        client.post("/register", data={"username": "q", "email": "q@example.com", "password": "pw", "confirm": "pw"})
+        client.post("/login", data={"username": "q", "password": "pw"})
+        client.get("/dashboard")  # warm the per-worker user cache
+
+        failures = 0
+        for method, url, data, budget in ROUTES:
+            del statements[:]
+            resp = client.open(url, method=method, data=data)
+            count = len(statements)
+            status = "ok" if count <= budget else "OVER BUDGET"
+            if count > budget:
+                failures += 1
+            print(f"{status:12} {method:5} {url:45} {resp.status_code}  {count}/{budget} statements")
+            if count > budget:
+                for sql in statements:
+                    print("             ", " ".join(sql.split())[:120])
+        cowork.connect_db = _connect_db
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,118 @@
+"""Stream workspaces, bookings, reviews or users between the database and CSV/JSONL.
+
+    python scripts/import_export.py export bookings --out bookings.csv
+    python scripts/import_export.py import workspaces partner.jsonl --upsert --images ./photos
+    python scripts/import_export.py import bookings bookings.csv --keep-ids
+
+The format comes from the file extension unless --format is given; "-" reads
+stdin or writes stdout. Rejected rows are listed on stderr and skipped, or abort
+the import with --strict (batches committed before that point stay committed).
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.normpath(os.path.join(BASE_DIR, '..'))
+sys.path.insert(0, ROOT)
+
+import app as cowork  # noqa: E402
+import bulk  # noqa: E402
+
+MAX_REPORTED_ERRORS = 50
+
+
+def open_stream(path, mode):
+    if path == "-":
+        return sys.stdin if mode == "r" else sys.stdout
+    return open(path, mode, newline="", encoding="utf-8")
+
+
+def guess_format(path, given):
+    if given:
+        return given
+    if path.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "csv"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.path.join(ROOT, 'cowork.db'))
+    parser.add_argument("--batch-size", type=int, default=bulk.BATCH_SIZE)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    exp = commands.add_parser("export", help="write a table as CSV or JSONL")
+    exp.add_argument("table", choices=sorted(bulk.EXPORT_COLUMNS))
+    exp.add_argument("--out", default="-")
+    exp.add_argument("--format", choices=bulk.FORMATS)
+
+    imp = commands.add_parser("import", help="load rows from CSV or JSONL")
+    imp.add_argument("table", choices=sorted(bulk.EXPORT_COLUMNS))
+    imp.add_argument("file")
+    imp.add_argument("--format", choices=bulk.FORMATS)
+    imp.add_argument("--upsert", action="store_true", help="workspaces: update the workspace with the same name")
+    imp.add_argument("--keep-ids", action="store_true", help="insert the id column as-is")
+    imp.add_argument("--images", help="directory that relative `image` paths are read from")
+    imp.add_argument("--strict", action="store_true", help="stop at the first invalid row")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print('Database file not found:', args.db)
+        return 1
+    cowork.create_app({"DATABASE": args.db})
+    cowork.init_db()
+    conn = cowork.connect_db(args.db, factory=sqlite3.Connection)
+    fmt = guess_format(args.out if args.command == "export" else args.file, args.format)
+    started = time.perf_counter()
+
+    if args.command == "export":
+        stream = open_stream(args.out, "w")
+        count = bulk.export_table(conn, args.table, stream, fmt, args.batch_size)
+        if stream is not sys.stdout:
+            stream.close()
+        conn.close()
+        print(f"Exported {count} {args.table} in {time.perf_counter() - started:.1f}s.", file=sys.stderr)
+        return 0
+
+    reported = []
+
+    def report(line, error):
+        if len(reported) < MAX_REPORTED_ERRORS:
+            print(f"line {line}: {error}", file=sys.stderr)
+        reported.append(line)
+
+    importer = bulk.Importer(
+        conn, args.table, upsert=args.upsert, keep_ids=args.keep_ids, image_dir=args.images,
+        upload_folder=cowork.app.config["UPLOAD_FOLDER"], allowed_extensions=cowork.ALLOWED_EXTENSIONS,
+        batch_size=args.batch_size,
+    )
+    stream = open_stream(args.file, "r")
+    try:
+        counts = importer.run(bulk.read_rows(stream, fmt), on_error=report, strict=args.strict)
+    except bulk.RowError as e:
+        print(f"Stopped: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        conn.close()
+    if len(reported) > MAX_REPORTED_ERRORS:
+        print(f"... and {len(reported) - MAX_REPORTED_ERRORS} more rejected rows", file=sys.stderr)
+    if args.table in ("workspaces", "reviews"):
+        # Listings changed; only a shared (file) cache is visible to running workers
+        cowork.get_cache().invalidate("explore", "search")
+    elapsed = time.perf_counter() - started
+    total = counts["inserted"] + counts["updated"]
+    print(
+        f"Imported {args.table}: {counts['inserted']} inserted, {counts['updated']} updated, "
+        f"{counts['rejected']} rejected in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/s).",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
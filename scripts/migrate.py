@@ -0,0 +1,51 @@
+"""Apply pending schema migrations to a database, reporting how long each one takes.
+
+Run this against large databases before deploying, while the app is stopped, so
+workers start against an up-to-date schema instead of migrating on first boot.
+
+    python scripts/migrate.py [--db path/to/cowork.db] [--status] [--to VERSION]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.normpath(os.path.join(BASE_DIR, '..'))
+sys.path.insert(0, ROOT)
+
+import migrations  # noqa: E402
+
+parser = argparse.ArgumentParser(description="Apply pending schema migrations.")
+parser.add_argument("--db", default=os.path.join(ROOT, 'cowork.db'))
+parser.add_argument("--status", action="store_true", help="list pending migrations and exit")
+parser.add_argument("--to", type=int, default=migrations.LATEST, help="stop at this schema version")
+parser.add_argument("--cache-mb", type=int, default=256, help="page cache used while building indexes")
+args = parser.parse_args()
+
+if not os.path.exists(args.db):
+    print('Database file not found:', args.db)
+    raise SystemExit(1)
+
+conn = sqlite3.connect(args.db)
+version = migrations.current_version(conn)
+todo = [(v, name) for v, name in migrations.pending(conn) if v <= args.to]
+print(f"Schema version {version}, latest {migrations.LATEST}, {len(todo)} pending.")
+if args.status or not todo:
+    for v, name in todo:
+        print(f"  {v:3d}  {name}")
+    conn.close()
+    raise SystemExit(0)
+
+conn.execute("PRAGMA journal_mode = WAL")
+conn.execute("PRAGMA cache_size = %d" % (-args.cache_mb * 1024))
+conn.execute("PRAGMA temp_store = MEMORY")
+
+started = time.perf_counter()
+for v, name in todo:
+    print(f"  {v:3d}  {name} ...", end="", flush=True)
+    applied = migrations.migrate(conn, target=v)
+    print(f" {applied[0][2]:.3f}s" if applied else " already applied")
+conn.close()
+print(f"Migrated to version {todo[-1][0]} in {time.perf_counter() - started:.2f}s.")
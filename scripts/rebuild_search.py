@@ -0,0 +1,33 @@
+"""Rebuild the workspaces_fts full-text index from the workspaces table.
+
+    python scripts/rebuild_search.py [--db path/to/cowork.db]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.normpath(os.path.join(BASE_DIR, '..'))
+sys.path.insert(0, ROOT)
+
+import search  # noqa: E402
+
+parser = argparse.ArgumentParser(description="Rebuild the full-text search index.")
+parser.add_argument("--db", default=os.path.join(ROOT, 'cowork.db'))
+args = parser.parse_args()
+
+if not os.path.exists(args.db):
+    print('Database file not found:', args.db)
+    raise SystemExit(1)
+
+conn = sqlite3.connect(args.db)
+for statement in search.SEARCH_SCHEMA:
+    conn.execute(statement)
+started = time.perf_counter()
+search.rebuild_index(conn)
+elapsed = time.perf_counter() - started
+count = conn.execute("SELECT COUNT(*) FROM workspaces").fetchone()[0]
+conn.close()
+print(f"Indexed {count} workspaces in {elapsed:.2f}s.")
@@ -0,0 +1,33 @@
+"""Rebuild the per-workspace daily/weekly/monthly booking rollups from the bookings table.
+
+    python scripts/recompute_host_stats.py [--db path/to/cowork.db]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.normpath(os.path.join(BASE_DIR, '..'))
+sys.path.insert(0, ROOT)
+
+import hosts  # noqa: E402
+
+parser = argparse.ArgumentParser(description="Recompute host occupancy and revenue rollups.")
+parser.add_argument("--db", default=os.path.join(ROOT, 'cowork.db'))
+args = parser.parse_args()
+
+if not os.path.exists(args.db):
+    print('Database file not found:', args.db)
+    raise SystemExit(1)
+
+conn = sqlite3.connect(args.db)
+for statement in hosts.STATS_SCHEMA:
+    conn.execute(statement)
+started = time.perf_counter()
+written = hosts.recompute_stats(conn)
+elapsed = time.perf_counter() - started
+count = conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+conn.close()
+print(f"Rolled {count} bookings into {written} daily/weekly/monthly rows in {elapsed:.2f}s.")
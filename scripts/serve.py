@@ -0,0 +1,279 @@
+"""Production server: a preforking master with a thread pool in every worker.
+
+    python scripts/serve.py --bind 0.0.0.0:8000 --workers 4 --threads 8 [--db path/to/cowork.db]
+
+The master configures the app, runs the migrations and compiles the templates
+once, binds the listening socket, and then forks the workers. Each worker starts
+with no pooled connections, caches or background threads of its own, so nothing
+opened before the fork is shared. The workers accept from the shared socket
+and run each request on one of their threads. The master restarts any worker
+that dies.
+
+SIGTERM or Ctrl-C stops the server gracefully. Workers stop accepting, finish
+the requests in flight, flush the write queue and close their connections. A
+worker still busy after --graceful-timeout seconds is killed.
+
+With more than one worker the query cache defaults to the file backend, in a
+fresh directory under /dev/shm (or the temp dir), so a write invalidates the
+cached pages of every worker, not just its own. The directory holds at most
+about --cache-entries pages; expired and surplus entries are swept as new ones
+are written. COWORK_CACHE_BACKEND and COWORK_CACHE_DIR override this.
+
+Set COWORK_SECRET_KEY so sessions survive restarts. Without it the master
+picks a random key, which the workers share until the next restart. Put a
+reverse proxy in front for TLS and slow clients.
+"""
+import argparse
+import errno
+import logging
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.normpath(os.path.join(BASE_DIR, '..'))
+sys.path.insert(0, ROOT)
+
+import app as cowork  # noqa: E402
+
+log = logging.getLogger("cowork.serve")
+
+# A worker that exits sooner than this after starting is crashing on boot; back off before respawning
+MIN_WORKER_LIFETIME = 1.0
+
+
+class RequestHandler(WSGIRequestHandler):
+    # One request per connection: a keep-alive client would otherwise hold a pool thread while idle
+    protocol_version = "HTTP/1.0"
+    # Drop clients that stall mid-request instead of letting them pin a thread
+    timeout = 30
+
+    def log_request(self, code="-", size="-"):
+        if self.server.access_log:
+            super().log_request(code, size)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug's server with requests handed to a fixed pool of threads.
+
+    The listening socket comes from the master (`fd`) and is non-blocking, so a
+    worker that loses the race for a connection to another worker just goes back
+    to waiting instead of blocking in accept().
+    """
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads, fd, access_log=False):
+        super().__init__(host, port, app, handler=RequestHandler, fd=fd)
+        self.socket.setblocking(False)
+        self.access_log = access_log
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="request")
+
+    def serve_forever(self, poll_interval=0.5):
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            # No longer accepting; let the requests already accepted finish
+            self._executor.shutdown(wait=True)
+
+    def process_request(self, request, client_address):
+        self._executor.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def parse_bind(value):
+    host, _, port = value.rpartition(":")
+    try:
+        return host.strip("[]") or "127.0.0.1", int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected host:port, got %r" % value)
+
+
+def listen(host, port, backlog):
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock, threads, access_log):
+    """Serve requests from `sock` until SIGTERM; returns once in-flight requests are done."""
+    cowork.reset_process_state()
+    host, port = sock.getsockname()[:2]
+    server = PooledWSGIServer(host, port, cowork.app, threads, sock.fileno(), access_log)
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever() to notice, so it can't run on this (the serving) thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        server.serve_forever()
+    finally:
+        cowork.shutdown_process()
+
+
+class Master:
+    """Forks the workers, replaces the ones that die, and stops them all on SIGTERM/SIGINT."""
+
+    def __init__(self, sock, workers, threads, access_log, graceful_timeout):
+        self.sock = sock
+        self.workers = workers
+        self.threads = threads
+        self.access_log = access_log
+        self.graceful_timeout = graceful_timeout
+        self.children = {}  # pid -> start time
+        self.stopping = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.sock, self.threads, self.access_log)
+            except BaseException:
+                log.exception("worker %d failed", os.getpid())
+                code = 1
+            finally:
+                # Skip the parent's atexit handlers and buffered state
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        log.info("started worker %d", pid)
+
+    def stop(self, signum, frame):
+        if not self.stopping:
+            log.info("stopping %d workers", len(self.children))
+            self.stopping = True
+            self.deadline = time.monotonic() + self.graceful_timeout
+            self.signal_children(signal.SIGTERM)
+
+    def signal_children(self, signum):
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def reap(self):
+        """Collect exited workers; returns [(pid, lifetime)]."""
+        exited = []
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            started = self.children.pop(pid, None)
+            if started is not None:
+                exited.append((pid, time.monotonic() - started))
+                if not self.stopping:
+                    log.warning("worker %d exited with status %d", pid, os.waitstatus_to_exitcode(status))
+        return exited
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+        while self.children:
+            time.sleep(0.2)
+            for pid, lifetime in self.reap():
+                if self.stopping:
+                    continue
+                if lifetime < MIN_WORKER_LIFETIME:
+                    time.sleep(MIN_WORKER_LIFETIME)
+                self.spawn()
+            if self.stopping and self.children and time.monotonic() > self.deadline:
+                log.warning("killing %d workers still busy after %.0fs", len(self.children), self.graceful_timeout)
+                self.signal_children(signal.SIGKILL)
+                self.deadline = float("inf")
+        log.info("all workers stopped")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Co-WorkSpace with preforked, threaded workers.")
+    parser.add_argument("--bind", type=parse_bind, default=("127.0.0.1", 8000), help="host:port (default 127.0.0.1:8000)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--threads", type=int, default=8, help="request threads per worker (default 8)")
+    parser.add_argument("--backlog", type=int, default=1024, help="listen backlog (default 1024)")
+    parser.add_argument("--graceful-timeout", type=float, default=30.0,
+                        help="seconds a stopping worker may spend on in-flight requests (default 30)")
+    parser.add_argument("--db", help="database file (default: COWORK_DB or cowork.db)")
+    parser.add_argument("--cache-entries", type=int, default=cowork.app.config["CACHE_MAXSIZE"],
+                        help="query cache size in pages (default %(default)s)")
+    parser.add_argument("--access-log", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(process)d] %(levelname)s %(message)s")
+    if not os.environ.get("COWORK_SECRET_KEY"):
+        log.warning("COWORK_SECRET_KEY is not set; sessions end when the server restarts")
+
+    workers = args.workers if hasattr(os, "fork") else 1
+    config = {"DEBUG": False, "CACHE_MAXSIZE": args.cache_entries}
+    if args.db:
+        config["DATABASE"] = os.path.abspath(args.db)
+    cache_dir = None
+    if workers > 1:
+        if "COWORK_CACHE_BACKEND" not in os.environ:
+            # Per-process memory caches would only see their own worker's invalidations
+            config["CACHE_BACKEND"] = "file"
+            if "COWORK_CACHE_DIR" not in os.environ:
+                # A fresh directory per run, so nothing cached before a restart is served
+                shm = "/dev/shm" if os.path.isdir("/dev/shm") else None
+                cache_dir = config["CACHE_DIR"] = tempfile.mkdtemp(prefix="cowork-cache-", dir=shm)
+        elif os.environ["COWORK_CACHE_BACKEND"] == "memory":
+            log.warning("the memory cache is per worker; other workers may serve stale pages for up to %ds "
+                        "after a write", cowork.app.config["CACHE_TTL"])
+    cowork.create_app(config)
+    cowork.init_db()
+    started = time.perf_counter()
+    templates = cowork.warm_up()
+    log.info("compiled %d templates in %.0f ms", templates, (time.perf_counter() - started) * 1000)
+    # The master only set things up; drop what it opened so no worker inherits it
+    cowork.shutdown_process()
+    cowork.reset_process_state()
+
+    host, port = args.bind
+    try:
+        sock = listen(host, port, args.backlog)
+    except OSError as e:
+        if e.errno == errno.EADDRINUSE:
+            parser.exit(1, "%s:%d is already in use\n" % (host, port))
+        raise
+    log.info("listening on http://%s:%d with %d workers x %d threads (%s cache, %d entries)",
+             host, port, workers, args.threads, cowork.app.config["CACHE_BACKEND"], args.cache_entries)
+
+    try:
+        if workers <= 1:
+            run_worker(sock, args.threads, args.access_log)
+        else:
+            Master(sock, workers, args.threads, args.access_log, args.graceful_timeout).run()
+    finally:
+        sock.close()
+        if cache_dir is not None:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
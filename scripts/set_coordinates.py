@@ -0,0 +1,61 @@
+"""Set latitude/longitude on existing workspaces from a CSV file.
+
+    python scripts/set_coordinates.py coordinates.csv [--db path/to/cowork.db]
+
+The CSV needs a header with `latitude`, `longitude`, and either `id` or `name`
+(the first workspace with that name). Empty coordinates clear a workspace's
+location. The near-me index is updated by triggers as rows change.
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import time
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.normpath(os.path.join(BASE_DIR, '..'))
+sys.path.insert(0, ROOT)
+
+import geo  # noqa: E402
+
+parser = argparse.ArgumentParser(description="Bulk-set workspace coordinates from CSV.")
+parser.add_argument("csv", help="CSV with id or name, latitude, longitude")
+parser.add_argument("--db", default=os.path.join(ROOT, 'cowork.db'))
+args = parser.parse_args()
+
+if not os.path.exists(args.db):
+    print('Database file not found:', args.db)
+    raise SystemExit(1)
+
+conn = sqlite3.connect(args.db)
+points, errors = [], 0
+with open(args.csv, newline="", encoding="utf-8") as f:
+    reader = csv.DictReader(f)
+    for row in reader:
+        try:
+            if (row.get("id") or "").strip():
+                workspace_id = int(row["id"])
+            else:
+                found = conn.execute(
+                    "SELECT id FROM workspaces WHERE name = ? ORDER BY id LIMIT 1", ((row.get("name") or "").strip(),)
+                ).fetchone()
+                if found is None:
+                    raise ValueError("no workspace named %r" % row.get("name"))
+                workspace_id = found[0]
+            lat, lon = (row.get("latitude") or "").strip(), (row.get("longitude") or "").strip()
+            if lat or lon:
+                lat, lon = geo.check_point(lat, lon)
+            else:
+                lat = lon = None
+        except ValueError as e:
+            errors += 1
+            print("line %d: %s" % (reader.line_num, e))
+            continue
+        points.append((workspace_id, lat, lon))
+
+started = time.perf_counter()
+updated = geo.set_coordinates(conn, points)
+elapsed = time.perf_counter() - started
+conn.close()
+print(f"Updated {updated} workspaces ({errors} rows rejected) in {elapsed:.2f}s.")
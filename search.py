@@ -0,0 +1,102 @@
+"""Full-text workspace search backed by an FTS5 index over name and description.
+
+`workspaces_fts` is an external-content table: it stores only the index and
+reads the text back from `workspaces`, and triggers keep it in sync on every
+insert, update and delete.
+"""
+import re
+
+from markupsafe import Markup, escape
+
+PAGE_SIZE = 24
+# Deepest page served; keeps OFFSET well inside SQLite's integer range
+MAX_PAGE = 1000
+# Name matches count ten times as much as description matches
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+# Private-use markers around matched terms, swapped for <mark> after HTML-escaping
+_HIT_START = "\ue000"
+_HIT_END = "\ue001"
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+SEARCH_SCHEMA = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS workspaces_fts USING fts5(
+        name, description,
+        content='workspaces', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    );
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS workspaces_fts_insert AFTER INSERT ON workspaces
+    BEGIN
+        INSERT INTO workspaces_fts(rowid, name, description) VALUES (NEW.id, NEW.name, NEW.description);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS workspaces_fts_delete AFTER DELETE ON workspaces
+    BEGIN
+        INSERT INTO workspaces_fts(workspaces_fts, rowid, name, description)
+        VALUES ('delete', OLD.id, OLD.name, OLD.description);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS workspaces_fts_update AFTER UPDATE OF name, description ON workspaces
+    BEGIN
+        INSERT INTO workspaces_fts(workspaces_fts, rowid, name, description)
+        VALUES ('delete', OLD.id, OLD.name, OLD.description);
+        INSERT INTO workspaces_fts(rowid, name, description) VALUES (NEW.id, NEW.name, NEW.description);
+    END;
+    """,
+)
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix.
+
+    Words are quoted so user input can never be parsed as FTS5 syntax. Returns None
+    when the text has no searchable words.
+    """
+    terms = _TERM.findall(text)
+    if not terms:
+        return None
+    quoted = ['"%s"' % t for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search_workspaces(conn, text, page=1, limit=PAGE_SIZE):
+    """Return (rows, has_more) for one page of BM25-ranked matches, best first."""
+    query = build_match_query(text)
+    if query is None:
+        return [], False
+    rows = conn.execute(
+        """
+        SELECT w.id, w.name, w.description, w.price_per_hour, w.rating, w.review_count,
+               w.image_path, w.currency,
+               snippet(workspaces_fts, 1, ?, ?, '…', 16) AS snippet
+        FROM workspaces_fts
+        JOIN workspaces w ON w.id = workspaces_fts.rowid
+        WHERE workspaces_fts MATCH ?
+        ORDER BY bm25(workspaces_fts, ?, ?)
+        LIMIT ? OFFSET ?
+        """,
+        (_HIT_START, _HIT_END, query, NAME_WEIGHT, DESCRIPTION_WEIGHT, limit + 1, (page - 1) * limit),
+    ).fetchall()
+    return rows[:limit], len(rows) > limit
+
+
+def highlight(snippet):
+    """HTML-escape a snippet and wrap its matched terms in <mark>."""
+    if not snippet:
+        return Markup("")
+    html = str(escape(snippet))
+    return Markup(html.replace(_HIT_START, "<mark>").replace(_HIT_END, "</mark>"))
+
+
+def rebuild_index(conn, commit=True):
+    conn.execute("INSERT INTO workspaces_fts(workspaces_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO workspaces_fts(workspaces_fts) VALUES ('optimize')")
+    if commit:
+        conn.commit()
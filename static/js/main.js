@@ -2,3 +2,71 @@
 // You can add small UI enhancements here if needed.
 
 console.log('CoWorkHub loaded');
+
+// Show free hourly start times for the selected booking date
+document.addEventListener('DOMContentLoaded', function () {
+    const hint = document.getElementById('availability-hint');
+    const dateInput = document.getElementById('booking_date');
+    if (!hint || !dateInput) {
+        return;
+    }
+
+    const refresh = function () {
+        if (!dateInput.value) {
+            hint.textContent = '';
+            return;
+        }
+        fetch(hint.dataset.url + '?date=' + encodeURIComponent(dateInput.value))
+            .then(function (res) { return res.ok ? res.json() : null; })
+            .then(function (data) {
+                if (!data) {
+                    hint.textContent = '';
+                } else if (data.free.length) {
+                    hint.textContent = 'Free start times: ' + data.free.join(', ');
+                } else {
+                    hint.textContent = 'Fully booked on this date.';
+                }
+            });
+    };
+
+    dateInput.addEventListener('change', refresh);
+    refresh();
+});
+
+// Fill the explore page's "near" field from the browser's location
+document.addEventListener('DOMContentLoaded', function () {
+    const button = document.getElementById('use-location');
+    const nearInput = document.getElementById('near');
+    if (!button || !nearInput || !navigator.geolocation) {
+        return;
+    }
+
+    button.hidden = false;
+    button.addEventListener('click', function () {
+        navigator.geolocation.getCurrentPosition(function (pos) {
+            nearInput.value = pos.coords.latitude.toFixed(4) + ',' + pos.coords.longitude.toFixed(4);
+            nearInput.form.submit();
+        });
+    });
+});
+
+// Load older reviews in place of the "Show older reviews" link
+document.addEventListener('click', function (event) {
+    const link = event.target.closest('[data-reviews-more]');
+    if (!link) {
+        return;
+    }
+    event.preventDefault();
+    const more = link.closest('.reviews-more');
+    link.setAttribute('aria-busy', 'true');
+    fetch(link.href, { headers: { Accept: 'text/html' } })
+        .then(function (res) { return res.ok ? res.text() : null; })
+        .then(function (html) {
+            if (html === null) {
+                link.removeAttribute('aria-busy');
+                return;
+            }
+            more.insertAdjacentHTML('afterend', html);
+            more.remove();
+        });
+});
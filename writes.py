@@ -0,0 +1,116 @@
+"""Group commit for booking and review inserts.
+
+With the queue enabled, request threads don't write themselves. They hand the
+write to one writer thread per worker process and wait for its answer. The
+writer drains whatever has queued up while the previous transaction was
+committing and applies it all in one BEGIN IMMEDIATE ... COMMIT. Each write runs
+in its own savepoint, so a conflicting booking is rolled back alone and only
+its caller sees the BookingConflict. Callers are answered only after the
+COMMIT, so a confirmation always means the row is in the database.
+
+Under load this replaces one lock handoff and WAL commit per booking with one
+per batch. A lone write is not delayed, because the writer never waits for a
+batch to fill.
+"""
+import logging
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+log = logging.getLogger(__name__)
+
+MAX_BATCH = 128
+
+
+class WriteQueue:
+    """A writer thread that applies submitted functions in shared transactions.
+
+    `connect` opens the writer's own connection. `submit(fn, *args)` runs
+    fn(conn, *args) on that thread and returns its result, or raises its exception.
+A write still queued when `timeout` runs out is withdrawn and TimeoutError raised.
+    """
+
+    def __init__(self, connect, max_batch=MAX_BATCH, timeout=10.0):
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.batches = 0
+        self.writes = 0
+        self._queue = queue.Queue()
+        self._connect = connect
+        self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args):
+        """Run fn(conn, *args) on the writer thread; TimeoutError means it was not applied."""
+        future = Future()
+        self._queue.put((fn, args, future))
+        try:
+            return future.result(self.timeout)
+        except FutureTimeout:
+            if future.cancel():
+                # Still queued: the writer will skip it, so the caller can safely retry
+                raise TimeoutError("write not applied within %gs" % self.timeout)
+        # Already in the transaction being committed; its outcome is moments away
+        return future.result()
+
+    def close(self):
+        """Finish what is queued, then stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                batch = [item]
+                stopping = False
+                while len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                self._apply(conn, batch)
+                if stopping:
+                    return
+        finally:
+            conn.close()
+
+    def _apply(self, conn, batch):
+        # Drop writes whose callers gave up waiting; the rest can no longer be cancelled
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, args, future in batch:
+                conn.execute("SAVEPOINT write")
+                try:
+                    outcomes.append((future, fn(conn, *args), None))
+                except Exception as exc:
+                    conn.execute("ROLLBACK TO write")
+                    outcomes.append((future, None, exc))
+                conn.execute("RELEASE write")
+            conn.commit()
+        except Exception as exc:
+            # The batch as a whole failed (e.g. the database stayed locked): nothing was written
+            log.exception("group commit of %d writes failed", len(batch))
+            if conn.in_transaction:
+                conn.rollback()
+            for _, _, future in batch:
+                future.set_exception(exc)
+            return
+        self.batches += 1
+        self.writes += len(batch)
+        for future, result, exc in outcomes:
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)